@@ -7,9 +7,29 @@ Shows comprehensive summary of all analyzed dataset data
 import json
 import sqlite3
 from pathlib import Path
-from collections import defaultdict
+from collections import Counter
 import pandas as pd
 
+# File extension -> reported file type
+_EXT_TO_TYPE = {
+    'data': 'HTML/Web Page',
+    'csv': 'CSV',
+    'json': 'JSON',
+    'xlsx': 'Excel'
+}
+
+# content_stats type -> reported content type
+_CONTENT_TYPE_LABELS = {
+    'unknown': 'Web Pages',
+    'csv': 'CSV Data',
+    'json': 'JSON Data'
+}
+
+def _histogram(values: pd.Series) -> Counter:
+    """Count occurrences of each value as a Counter of plain ints"""
+    counts = values.value_counts(dropna=False)
+    return Counter({key: int(count) for key, count in counts.items()})
+
 def get_data_summary():
     """Get comprehensive summary of all analyzed data"""
     
@@ -17,39 +37,41 @@ def get_data_summary():
     conn = sqlite3.connect("datasets.db")
     cursor = conn.cursor()
     
-    # Get all datasets
-    cursor.execute('''
-        SELECT ds.dataset_id, ds.snapshot_date, ds.row_count, ds.column_count, 
-               ds.file_size, ds.created_at
-        FROM dataset_states ds
-        INNER JOIN (
-            SELECT dataset_id, MAX(created_at) as max_created
-            FROM dataset_states 
-            GROUP BY dataset_id
-        ) latest ON ds.dataset_id = latest.dataset_id 
-        AND ds.created_at = latest.max_created
-        ORDER BY ds.created_at DESC
-    ''')
-    
-    columns = [description[0] for description in cursor.description]
-    datasets = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    # Get all datasets (latest state per dataset)
+    datasets = pd.read_sql_query('''
+        SELECT dataset_id, snapshot_date, row_count, column_count, 
+               file_size, created_at
+        FROM (
+            SELECT dataset_id, snapshot_date, row_count, column_count, 
+                   file_size, created_at,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY dataset_id ORDER BY created_at DESC
+                   ) as rn
+            FROM dataset_states
+        )
+        WHERE rn = 1
+        ORDER BY created_at DESC
+    ''', conn)
     
     conn.close()
     
     # Analyze each dataset
     summary = {
         'total_datasets': len(datasets),
-        'datasets_by_agency': defaultdict(int),
-        'datasets_by_type': defaultdict(int),
-        'file_types': defaultdict(int),
+        'datasets_by_agency': Counter(),
+        'datasets_by_type': Counter(),
+        'file_types': Counter(),
         'total_file_size': 0,
         'datasets_with_data': 0,
         'datasets_with_html': 0,
         'sample_datasets': []
     }
     
-    for i, dataset in enumerate(datasets):
-        dataset_id = dataset['dataset_id']
+    # Per-dataset and per-file rows collected from metadata, aggregated with pandas below
+    dataset_rows = []
+    filenames = []
+    
+    for i, dataset_id in enumerate(datasets['dataset_id']):
         dataset_states_dir = Path(f"dataset_states/{dataset_id}")
         
         if not dataset_states_dir.exists():
@@ -70,42 +92,18 @@ def get_data_summary():
             with open(metadata_file, 'r') as f:
                 metadata = json.load(f)
             
-            # Agency analysis
             agency = metadata.get('agency', 'Unknown')
-            summary['datasets_by_agency'][agency] += 1
+            files = metadata.get('files', [])
+            content_stats = metadata.get('content_stats', {})
+            total_size = sum(f.get('size', 0) for f in files)
+            
+            dataset_rows.append({'agency': agency, 'content_type': content_stats.get('type')})
             
             # File analysis
-            files = metadata.get('files', [])
             if files:
                 summary['datasets_with_data'] += 1
-                summary['total_file_size'] += sum(f.get('size', 0) for f in files)
-                
-                for file_info in files:
-                    filename = file_info.get('filename', '')
-                    file_size = file_info.get('size', 0)
-                    
-                    if filename.endswith('.data'):
-                        summary['file_types']['HTML/Web Page'] += 1
-                        summary['datasets_with_html'] += 1
-                    elif filename.endswith('.csv'):
-                        summary['file_types']['CSV'] += 1
-                    elif filename.endswith('.json'):
-                        summary['file_types']['JSON'] += 1
-                    elif filename.endswith('.xlsx'):
-                        summary['file_types']['Excel'] += 1
-                    else:
-                        summary['file_types']['Other'] += 1
-            
-            # Content analysis
-            content_stats = metadata.get('content_stats', {})
-            if content_stats.get('type') == 'unknown':
-                summary['datasets_by_type']['Web Pages'] += 1
-            elif content_stats.get('type') == 'csv':
-                summary['datasets_by_type']['CSV Data'] += 1
-            elif content_stats.get('type') == 'json':
-                summary['datasets_by_type']['JSON Data'] += 1
-            else:
-                summary['datasets_by_type']['Other'] += 1
+                summary['total_file_size'] += total_size
+                filenames.extend(file_info.get('filename', '') for file_info in files)
             
             # Sample datasets (first 5)
             if i < 5:
@@ -116,7 +114,7 @@ def get_data_summary():
                     'url': metadata.get('url', ''),
                     'availability': metadata.get('availability', 'unknown'),
                     'file_count': len(files),
-                    'total_size': sum(f.get('size', 0) for f in files),
+                    'total_size': total_size,
                     'content_type': content_stats.get('type', 'unknown'),
                     'row_count': content_stats.get('row_count', 0),
                     'column_count': content_stats.get('column_count', 0)
@@ -126,6 +124,18 @@ def get_data_summary():
             print(f"Error processing {dataset_id}: {e}")
             continue
     
+    if dataset_rows:
+        df = pd.DataFrame(dataset_rows)
+        summary['datasets_by_agency'] = _histogram(df['agency'])
+        summary['datasets_by_type'] = _histogram(
+            df['content_type'].map(_CONTENT_TYPE_LABELS).fillna('Other')
+        )
+    
+    if filenames:
+        extensions = pd.Series(filenames, dtype=object).str.extract(r'\.([^.]+)$')[0]
+        summary['file_types'] = _histogram(extensions.map(_EXT_TO_TYPE).fillna('Other'))
+        summary['datasets_with_html'] = int((extensions == 'data').sum())
+    
     return summary
 
 def print_data_summary():
@@ -135,33 +145,35 @@ def print_data_summary():
     print("=" * 60)
     
     summary = get_data_summary()
+    total_mb = summary['total_file_size'] / (1024 * 1024)
     
     print(f"\n OVERVIEW")
     print(f"Total Datasets Analyzed: {summary['total_datasets']}")
     print(f"Datasets with Data Files: {summary['datasets_with_data']}")
     print(f"Datasets with HTML/Web Pages: {summary['datasets_with_html']}")
-    print(f"Total Data Size: {(summary['total_file_size'] / 1024 / 1024):.1f} MB")
+    print(f"Total Data Size: {total_mb:.1f} MB")
     
     print(f"\n🏛️ DATASETS BY AGENCY")
-    for agency, count in sorted(summary['datasets_by_agency'].items(), key=lambda x: x[1], reverse=True):
+    for agency, count in summary['datasets_by_agency'].most_common():
         print(f"  {agency}: {count}")
     
     print(f"\n📁 FILE TYPES")
-    for file_type, count in sorted(summary['file_types'].items(), key=lambda x: x[1], reverse=True):
+    for file_type, count in summary['file_types'].most_common():
         print(f"  {file_type}: {count}")
     
     print(f"\n📋 CONTENT TYPES")
-    for content_type, count in sorted(summary['datasets_by_type'].items(), key=lambda x: x[1], reverse=True):
+    for content_type, count in summary['datasets_by_type'].most_common():
         print(f"  {content_type}: {count}")
     
     print(f"\n🔍 SAMPLE DATASETS")
     for i, dataset in enumerate(summary['sample_datasets'], 1):
+        size_kb = dataset['total_size'] / 1024
         print(f"\n{i}. {dataset['title']}")
         print(f"   Agency: {dataset['agency']}")
         print(f"   ID: {dataset['id']}")
         print(f"   URL: {dataset['url']}")
         print(f"   Status: {dataset['availability']}")
-        print(f"   Files: {dataset['file_count']} ({(dataset['total_size'] / 1024):.1f} KB)")
+        print(f"   Files: {dataset['file_count']} ({size_kb:.1f} KB)")
         print(f"   Content: {dataset['content_type']}")
         if dataset['row_count'] > 0:
             print(f"   Data: {dataset['row_count']} rows × {dataset['column_count']} columns")
@@ -230,24 +230,42 @@ class DatasetEnhancer:
             return 'Very Active'
     
     def _calculate_stability_score(self, dataset_id: str) -> float:
-        """Calculate dataset stability score (0-100)"""
+        """Calculate dataset stability score (0-100)
+        
+        Only the latest two snapshots are read first; a dataset whose latest
+        pair is unchanged scores 100 without scanning the deeper window.
+        """
         conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
-        cursor.execute("""
+        query = """
             SELECT content_hash, schema_hash, row_count, column_count
             FROM dataset_states
             WHERE dataset_id = ?
             ORDER BY snapshot_date DESC
-            LIMIT 10
-        """, (dataset_id,))
+            LIMIT ?
+        """
         
+        cursor.execute(query, (dataset_id, 2))
         snapshots = cursor.fetchall()
-        conn.close()
         
         if len(snapshots) < 2:
+            conn.close()
             return 100.0  # Single snapshot is considered stable
         
+        latest, previous = snapshots
+        if (latest['content_hash'] == previous['content_hash'] and
+            latest['schema_hash'] == previous['schema_hash'] and
+            latest['row_count'] == previous['row_count'] and
+            latest['column_count'] == previous['column_count']):
+            conn.close()
+            return 100.0  # Latest snapshots identical
+        
+        cursor.execute(query, (dataset_id, 10))
+        snapshots = cursor.fetchall()
+        conn.close()
+        
         # Calculate stability based on content and schema changes
         content_changes = 0
         schema_changes = 0
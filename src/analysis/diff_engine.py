@@ -1,6 +1,7 @@
 """
 Dataset comparison engine to identify vanished datasets
 """
+import re
 import sqlite3
 from typing import List, Dict, Set
 from datetime import datetime
@@ -8,6 +9,16 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Title keywords mapped to suspected causes, in order of precedence
+_CAUSE_BY_KEYWORD = {
+    'covid': "Policy change - COVID data sunset",
+    'pandemic': "Policy change - COVID data sunset",
+    'climate': "Potential policy takedown",
+    'draft': "Draft-only status",
+}
+_CAUSE_RX = re.compile('|'.join(_CAUSE_BY_KEYWORD))
+_HEALTH_AGENCIES = frozenset({'cdc', 'fda', 'nih'})
+
 class DiffEngine:
     def __init__(self, db_path: str = "datasets.db"):
         self.db_path = db_path
@@ -91,13 +102,14 @@ class DiffEngine:
         title = dataset.get('title', '').lower()
         agency = dataset.get('agency', '').lower()
         
-        if 'covid' in title or 'pandemic' in title:
-            return "Policy change - COVID data sunset"
-        elif 'climate' in title:
-            return "Potential policy takedown"
-        elif 'draft' in title:
-            return "Draft-only status"
-        elif agency in ['cdc', 'fda', 'nih']:
+        # Single regex pass over the title; precedence follows _CAUSE_BY_KEYWORD
+        matched = set(_CAUSE_RX.findall(title))
+        if matched:
+            for keyword, cause in _CAUSE_BY_KEYWORD.items():
+                if keyword in matched:
+                    return cause
+        
+        if agency in _HEALTH_AGENCIES:
             return "Health data policy change"
         else:
             return "Unknown - requires investigation"
@@ -5,17 +5,103 @@ Implements patch-based diffing with column-level changes and data previews
 """
 
 import json
+import os
 import sqlite3
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
 import hashlib
-from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, TYPE_CHECKING
 import logging
 from dataclasses import dataclass
 from enum import Enum
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+# Only needed to read payloads older databases stored as compressed BLOBs
+try:
+    import msgpack
+    import zstandard
+    BLOB_COMPRESSION_AVAILABLE = True
+except ImportError:
+    BLOB_COMPRESSION_AVAILABLE = False
+    msgpack = None
+    zstandard = None
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger(__name__)
 
+# Per-connection tuning for the bulk snapshot/change writes
+CONNECTION_PRAGMAS = [
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64MB
+    "PRAGMA mmap_size=268435456"  # 256MB
+]
+
+# Seconds a connection waits for another writer's lock before failing;
+# parallel workers queue on BEGIN IMMEDIATE for one dataset's write at a time
+BUSY_TIMEOUT = 60.0
+
+# Statement texts are shared module constants so every call hits the
+# connection's compiled-statement cache
+INSERT_SCHEMA_SNAPSHOT_SQL = '''
+    INSERT OR REPLACE INTO schema_snapshots
+    (dataset_id, snapshot_date, columns, column_types, row_count, 
+     sample_data, schema_hash, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+INSERT_COLUMN_CHANGE_SQL = '''
+    INSERT INTO column_changes
+    (dataset_id, from_snapshot_date, to_snapshot_date, change_type,
+     column_name, old_value, new_value, old_type, new_type,
+     sample_old_data, sample_new_data, change_magnitude, confidence_score)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Type ordering used to size type changes
+TYPE_HIERARCHY = {
+    'int': 1, 'float': 2, 'str': 3, 'bool': 4, 
+    'datetime': 5, 'object': 6, 'unknown': 7
+}
+
+# Pre-serialized values for the null/empty columns most change rows carry
+_JSON_NULL = "null"
+_JSON_EMPTY = "[]"
+
+def _json_bytes(value: Any, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON encoding, via orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+    return json.dumps(value, sort_keys=sort_keys, separators=(',', ':'),
+                      ensure_ascii=False).encode()
+
+def _dumps(value: Any) -> str:
+    """Serialize a value to compact JSON, skipping serialization for None and []"""
+    if value is None:
+        return _JSON_NULL
+    if value == []:
+        return _JSON_EMPTY
+    return _json_bytes(value).decode()
+
+_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+def decode_stored(value: Any, default: Any = None) -> Any:
+    """Decode a payload column written as JSON text or as a legacy BLOB"""
+    if not value:
+        return default
+    if isinstance(value, bytes):
+        if not BLOB_COMPRESSION_AVAILABLE:
+            raise RuntimeError("Stored payload is a compressed BLOB; install msgpack and zstandard to read it")
+        return msgpack.unpackb(zstandard.decompress(value))
+    return _loads(value)
+
 class ChangeType(Enum):
     COLUMN_ADDED = "column_added"
     COLUMN_REMOVED = "column_removed"
@@ -25,6 +111,9 @@ class ChangeType(Enum):
     ROW_ADDED = "row_added"
     ROW_REMOVED = "row_removed"
 
+# Enum member -> stored string, so row building avoids the .value descriptor
+CHANGE_TYPE_VALUES = {change_type: change_type.value for change_type in ChangeType}
+
 @dataclass
 class ColumnChange:
     change_type: ChangeType
@@ -50,14 +139,31 @@ class SchemaSnapshot:
     content_hash: str
 
 class EnhancedColumnDiffing:
-    def __init__(self, db_path: str = "datasets.db"):
+    def __init__(self, db_path: str = "datasets.db", init_tables: bool = True):
         self.db_path = db_path
-        self.init_diffing_tables()
+        self.conn = self._connect()
+        if init_tables:
+            self.init_diffing_tables()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a database connection with the diffing PRAGMAs applied"""
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                               check_same_thread=False, cached_statements=256)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def close(self):
+        """Close the shared database connection"""
+        self.conn.close()
     
     def init_diffing_tables(self):
         """Initialize tables for enhanced diffing"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
+        
+        # WAL is persistent on the database file, so it only needs setting once
+        if cursor.execute("PRAGMA journal_mode").fetchone()[0] != 'wal':
+            cursor.execute("PRAGMA journal_mode=WAL")
         
         # Schema snapshots table
         cursor.execute('''
@@ -97,8 +203,18 @@ class EnhancedColumnDiffing:
             )
         ''')
         
-        conn.commit()
-        conn.close()
+        # Indexes for the per-dataset change lookup and snapshot lookup.
+        # Changes are read newest-first by id (insertion order), which the
+        # index streams without a temp sort.
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_cc_lookup 
+            ON column_changes(dataset_id, id DESC)
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_ss_dataset_date 
+            ON schema_snapshots(dataset_id, snapshot_date)
+        ''')
     
     def create_schema_snapshot(self, dataset_id: str, snapshot_date: str, 
                               data: Dict[str, Any]) -> SchemaSnapshot:
@@ -116,8 +232,12 @@ class EnhancedColumnDiffing:
             'column_types': column_types,
             'row_count': row_count
         }
-        schema_hash = hashlib.sha256(json.dumps(schema_data, sort_keys=True).encode()).hexdigest()
-        content_hash = data.get('content_hash', '') or hashlib.sha256(str(data).encode()).hexdigest()
+        # BLAKE2b is only used for change detection, so a 128-bit digest is plenty
+        schema_buf = _json_bytes(schema_data, sort_keys=True)
+        schema_hash = hashlib.blake2b(schema_buf, digest_size=16).hexdigest()
+        content_hash = data.get('content_hash', '') or self._hash_sample_data(
+            data, columns, sample_data
+        )
         
         return SchemaSnapshot(
             dataset_id=dataset_id,
@@ -130,78 +250,123 @@ class EnhancedColumnDiffing:
             content_hash=content_hash
         )
     
+    def _hash_sample_data(self, data: Dict[str, Any], columns: List[str], 
+                          sample_data: List[Dict[str, Any]]) -> str:
+        """Hash sample rows and columns when no content hash was supplied"""
+        import pandas as pd
+        
+        try:
+            sample_df = pd.DataFrame(sample_data, dtype=object)
+            row_hashes = pd.util.hash_pandas_object(sample_df, index=False).values
+        except (TypeError, ValueError):
+            # Nested sample values can't be hashed by pandas; hash the repr instead
+            return hashlib.blake2b(str(data).encode(), digest_size=16).hexdigest()
+        
+        return hashlib.blake2b(
+            row_hashes.tobytes() + _json_bytes(columns), digest_size=16
+        ).hexdigest()
+    
     def store_schema_snapshot(self, snapshot: SchemaSnapshot):
         """Store schema snapshot in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        self.store_schema_snapshots([snapshot])
+    
+    def store_schema_snapshots(self, snapshots: List[SchemaSnapshot]):
+        """Store a batch of schema snapshots in a single transaction"""
+        cursor = self.conn.cursor()
         
-        try:
-            cursor.execute('''
-                INSERT OR REPLACE INTO schema_snapshots
-                (dataset_id, snapshot_date, columns, column_types, row_count, 
-                 sample_data, schema_hash, content_hash)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+        rows = [
+            (
                 snapshot.dataset_id,
                 snapshot.snapshot_date,
-                json.dumps(snapshot.columns),
-                json.dumps(snapshot.column_types),
+                _dumps(snapshot.columns),
+                _dumps(snapshot.column_types),
                 snapshot.row_count,
-                json.dumps(snapshot.sample_data),
+                _dumps(snapshot.sample_data),
                 snapshot.schema_hash,
                 snapshot.content_hash
-            ))
+            )
+            for snapshot in snapshots
+        ]
+        
+        # Join the caller's transaction if one is open (bulk load)
+        owns_transaction = not self.conn.in_transaction
+        
+        try:
+            if owns_transaction:
+                cursor.execute("BEGIN")
+            cursor.executemany(INSERT_SCHEMA_SNAPSHOT_SQL, rows)
             
-            conn.commit()
+            if owns_transaction:
+                self.conn.commit()
             
         except Exception as e:
+            if not owns_transaction:
+                # Let the caller roll back the whole batch
+                raise
             logger.error(f"Error storing schema snapshot: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
+            self.conn.rollback()
     
     def compare_schemas(self, from_snapshot: SchemaSnapshot, 
                        to_snapshot: SchemaSnapshot) -> List[ColumnChange]:
         """Compare two schema snapshots and return column changes"""
+        # pandas is imported lazily so callers that only read changes stay lightweight
+        import pandas as pd
+        
         changes = []
         
         from_cols = set(from_snapshot.columns)
         to_cols = set(to_snapshot.columns)
+        from_types = from_snapshot.column_types
+        to_types = to_snapshot.column_types
+        
+        # Build the sample frames once per comparison
+        old_df = pd.DataFrame(from_snapshot.sample_data, dtype=object)
+        new_df = pd.DataFrame(to_snapshot.sample_data, dtype=object)
         
-        # Find added columns
-        for col in to_cols - from_cols:
-            changes.append(ColumnChange(
-                change_type=ChangeType.COLUMN_ADDED,
-                column_name=col,
-                old_value=None,
-                new_value=to_snapshot.column_types.get(col, 'unknown'),
-                old_type='none',
-                new_type=to_snapshot.column_types.get(col, 'unknown'),
-                sample_old_data=[],
-                sample_new_data=self._extract_column_sample(to_snapshot.sample_data, col),
-                change_magnitude=1.0,
-                confidence_score=1.0
-            ))
-        
-        # Find removed columns
-        for col in from_cols - to_cols:
-            changes.append(ColumnChange(
-                change_type=ChangeType.COLUMN_REMOVED,
-                column_name=col,
-                old_value=from_snapshot.column_types.get(col, 'unknown'),
-                new_value=None,
-                old_type=from_snapshot.column_types.get(col, 'unknown'),
-                new_type='none',
-                sample_old_data=self._extract_column_sample(from_snapshot.sample_data, col),
-                sample_new_data=[],
-                change_magnitude=1.0,
-                confidence_score=1.0
-            ))
-        
-        # Find changed columns (type changes)
-        for col in from_cols & to_cols:
-            old_type = from_snapshot.column_types.get(col, 'unknown')
-            new_type = to_snapshot.column_types.get(col, 'unknown')
+        # Single pass over every column; each side is sampled at most once
+        for col in from_cols | to_cols:
+            in_old = col in from_cols
+            in_new = col in to_cols
+            
+            # Added column
+            if not in_old:
+                new_type = to_types.get(col, 'unknown')
+                changes.append(ColumnChange(
+                    change_type=ChangeType.COLUMN_ADDED,
+                    column_name=col,
+                    old_value=None,
+                    new_value=new_type,
+                    old_type='none',
+                    new_type=new_type,
+                    sample_old_data=[],
+                    sample_new_data=self._extract_column_sample(new_df, col),
+                    change_magnitude=1.0,
+                    confidence_score=1.0
+                ))
+                continue
+            
+            # Removed column
+            if not in_new:
+                old_type = from_types.get(col, 'unknown')
+                changes.append(ColumnChange(
+                    change_type=ChangeType.COLUMN_REMOVED,
+                    column_name=col,
+                    old_value=old_type,
+                    new_value=None,
+                    old_type=old_type,
+                    new_type='none',
+                    sample_old_data=self._extract_column_sample(old_df, col),
+                    sample_new_data=[],
+                    change_magnitude=1.0,
+                    confidence_score=1.0
+                ))
+                continue
+            
+            # Shared column: type change and data change
+            old_type = from_types.get(col, 'unknown')
+            new_type = to_types.get(col, 'unknown')
+            old_values = self._extract_column_sample(old_df, col)
+            new_values = self._extract_column_sample(new_df, col)
             
             if old_type != new_type:
                 changes.append(ColumnChange(
@@ -211,116 +376,111 @@ class EnhancedColumnDiffing:
                     new_value=new_type,
                     old_type=old_type,
                     new_type=new_type,
-                    sample_old_data=self._extract_column_sample(from_snapshot.sample_data, col),
-                    sample_new_data=self._extract_column_sample(to_snapshot.sample_data, col),
+                    sample_old_data=old_values,
+                    sample_new_data=new_values,
                     change_magnitude=self._calculate_type_change_magnitude(old_type, new_type),
                     confidence_score=0.9
                 ))
             
             # Check for data changes in existing columns
-            data_change = self._detect_data_changes(
-                from_snapshot.sample_data, 
-                to_snapshot.sample_data, 
-                col
+            data_change = self._detect_data_changes_from_sets(
+                {str(v) for v in old_values if v is not None},
+                {str(v) for v in new_values if v is not None}
             )
             
             if data_change['changed']:
                 changes.append(ColumnChange(
                     change_type=ChangeType.DATA_CHANGED,
                     column_name=col,
-                    old_value=data_change['old_sample'],
-                    new_value=data_change['new_sample'],
+                    old_value=old_values,
+                    new_value=new_values,
                     old_type=old_type,
                     new_type=new_type,
-                    sample_old_data=data_change['old_sample'],
-                    sample_new_data=data_change['new_sample'],
+                    sample_old_data=old_values,
+                    sample_new_data=new_values,
                     change_magnitude=data_change['magnitude'],
                     confidence_score=data_change['confidence']
                 ))
         
         return changes
     
-    def _extract_column_sample(self, sample_data: List[Dict[str, Any]], column: str) -> List[Any]:
+    def _extract_column_sample(self, df: 'pd.DataFrame', column: str) -> List[Any]:
         """Extract sample data for a specific column"""
-        return [row.get(column) for row in sample_data if column in row][:5]
+        if column not in df.columns:
+            return []
+        
+        import numpy as np
+        
+        values = df[column]
+        # Rows without the key come through as NaN; explicit nulls stay None
+        present = values.notna() | np.equal(values.to_numpy(), None)
+        return values[present].head(5).tolist()
     
-    def _calculate_type_change_magnitude(self, old_type: str, new_type: str) -> float:
+    @staticmethod
+    def _calculate_type_change_magnitude(old_type: str, new_type: str) -> float:
         """Calculate magnitude of type change"""
-        type_hierarchy = {
-            'int': 1, 'float': 2, 'str': 3, 'bool': 4, 
-            'datetime': 5, 'object': 6, 'unknown': 7
-        }
-        
-        old_level = type_hierarchy.get(old_type.lower(), 7)
-        new_level = type_hierarchy.get(new_type.lower(), 7)
+        old_level = TYPE_HIERARCHY.get(old_type.lower(), 7)
+        new_level = TYPE_HIERARCHY.get(new_type.lower(), 7)
         
         return abs(old_level - new_level) / 7.0
     
-    def _detect_data_changes(self, old_data: List[Dict[str, Any]], 
-                           new_data: List[Dict[str, Any]], 
-                           column: str) -> Dict[str, Any]:
-        """Detect data changes in a specific column"""
-        old_values = self._extract_column_sample(old_data, column)
-        new_values = self._extract_column_sample(new_data, column)
-        
-        if not old_values and not new_values:
-            return {'changed': False, 'magnitude': 0.0, 'confidence': 0.0}
-        
+    def _detect_data_changes_from_sets(self, old_set: set, new_set: set) -> Dict[str, Any]:
+        """Detect data changes between the value sets of two column samples"""
         # Simple change detection based on sample data
-        old_set = set(str(v) for v in old_values if v is not None)
-        new_set = set(str(v) for v in new_values if v is not None)
-        
         if old_set == new_set:
             return {'changed': False, 'magnitude': 0.0, 'confidence': 0.0}
         
-        # Calculate change magnitude
-        intersection = old_set & new_set
-        union = old_set | new_set
-        jaccard_similarity = len(intersection) / len(union) if union else 0
+        # Calculate change magnitude without building the union set
+        intersection_size = len(old_set & new_set)
+        union_size = len(old_set) + len(new_set) - intersection_size
+        jaccard_similarity = intersection_size / union_size if union_size else 0
         magnitude = 1.0 - jaccard_similarity
         
         return {
             'changed': True,
             'magnitude': magnitude,
-            'confidence': 0.8,
-            'old_sample': old_values,
-            'new_sample': new_values
+            'confidence': 0.8
         }
     
     def store_column_changes(self, changes: List[ColumnChange], dataset_id: str, 
                            from_date: str, to_date: str):
         """Store column changes in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
+        
+        # Rows are generated lazily so executemany only holds one at a time
+        change_type_values = CHANGE_TYPE_VALUES
+        rows = (
+            (
+                dataset_id, from_date, to_date, change_type_values[change.change_type],
+                change.column_name, _dumps(change.old_value), _dumps(change.new_value),
+                change.old_type, change.new_type,
+                _dumps(change.sample_old_data), _dumps(change.sample_new_data),
+                change.change_magnitude, change.confidence_score
+            )
+            for change in changes
+        )
+        
+        # Join the caller's transaction if one is open (bulk load)
+        owns_transaction = not self.conn.in_transaction
         
         try:
-            for change in changes:
-                cursor.execute('''
-                    INSERT INTO column_changes
-                    (dataset_id, from_snapshot_date, to_snapshot_date, change_type,
-                     column_name, old_value, new_value, old_type, new_type,
-                     sample_old_data, sample_new_data, change_magnitude, confidence_score)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    dataset_id, from_date, to_date, change.change_type.value,
-                    change.column_name, json.dumps(change.old_value), json.dumps(change.new_value),
-                    change.old_type, change.new_type,
-                    json.dumps(change.sample_old_data), json.dumps(change.sample_new_data),
-                    change.change_magnitude, change.confidence_score
-                ))
+            if owns_transaction:
+                cursor.execute("BEGIN")
+            cursor.executemany(INSERT_COLUMN_CHANGE_SQL, rows)
             
-            conn.commit()
+            if owns_transaction:
+                self.conn.commit()
             
         except Exception as e:
+            if not owns_transaction:
+                # Let the caller roll back the whole batch
+                raise
             logger.error(f"Error storing column changes: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
+            self.conn.rollback()
     
     def get_column_changes(self, dataset_id: str, limit: int = 50) -> List[Dict]:
         """Get column changes for a dataset"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         
         cursor.execute('''
             SELECT change_type, column_name, old_value, new_value, old_type, new_type,
@@ -328,7 +488,7 @@ class EnhancedColumnDiffing:
                    from_snapshot_date, to_snapshot_date
             FROM column_changes
             WHERE dataset_id = ?
-            ORDER BY created_at DESC
+            ORDER BY id DESC
             LIMIT ?
         ''', (dataset_id, limit))
         
@@ -337,25 +497,23 @@ class EnhancedColumnDiffing:
             changes.append({
                 'change_type': row[0],
                 'column_name': row[1],
-                'old_value': json.loads(row[2]) if row[2] else None,
-                'new_value': json.loads(row[3]) if row[3] else None,
+                'old_value': decode_stored(row[2]),
+                'new_value': decode_stored(row[3]),
                 'old_type': row[4],
                 'new_type': row[5],
-                'sample_old_data': json.loads(row[6]) if row[6] else [],
-                'sample_new_data': json.loads(row[7]) if row[7] else [],
+                'sample_old_data': decode_stored(row[6], []),
+                'sample_new_data': decode_stored(row[7], []),
                 'change_magnitude': row[8],
                 'confidence_score': row[9],
                 'from_date': row[10],
                 'to_date': row[11]
             })
         
-        conn.close()
         return changes
     
     def process_dataset_snapshots(self, dataset_id: str):
         """Process all snapshots for a dataset to create schema snapshots and detect changes"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         
         # Get all snapshots for this dataset
         cursor.execute('''
@@ -365,9 +523,14 @@ class EnhancedColumnDiffing:
             ORDER BY snapshot_date ASC
         ''', (dataset_id,))
         
+        self.process_snapshot_group(dataset_id, cursor.fetchall())
+    
+    def process_snapshot_group(self, dataset_id: str, rows: List[Tuple]):
+        """Create schema snapshots and detect changes from a dataset's ordered
+        (snapshot_date, schema, content_hash, row_count, column_count) rows"""
         snapshots = []
-        for row in cursor.fetchall():
-            schema_data = json.loads(row[1]) if row[1] else {}
+        for row in rows:
+            schema_data = _loads(row[1]) if row[1] else {}
             snapshots.append({
                 'date': row[0],
                 'schema': schema_data,
@@ -376,13 +539,13 @@ class EnhancedColumnDiffing:
                 'column_count': row[4] or 0
             })
         
-        conn.close()
-        
         if len(snapshots) < 2:
             return
         
         # Create schema snapshots and compare
         previous_snapshot = None
+        schema_snapshots = []
+        pending_changes = []
         
         for snapshot_data in snapshots:
             # Create schema snapshot
@@ -398,41 +561,94 @@ class EnhancedColumnDiffing:
                 }
             )
             
-            self.store_schema_snapshot(schema_snapshot)
+            schema_snapshots.append(schema_snapshot)
+            
+            # Matching hashes mean nothing can have changed; skip the deep compare
+            if (previous_snapshot and
+                previous_snapshot.content_hash == schema_snapshot.content_hash and
+                previous_snapshot.schema_hash == schema_snapshot.schema_hash):
+                previous_snapshot = schema_snapshot
+                continue
             
             # Compare with previous snapshot
             if previous_snapshot:
                 changes = self.compare_schemas(previous_snapshot, schema_snapshot)
                 if changes:
-                    self.store_column_changes(
+                    pending_changes.append((
                         changes, 
-                        dataset_id, 
                         previous_snapshot.snapshot_date, 
                         schema_snapshot.snapshot_date
-                    )
+                    ))
                     print(f"Found {len(changes)} column changes for {dataset_id} between {previous_snapshot.snapshot_date} and {schema_snapshot.snapshot_date}")
             
             previous_snapshot = schema_snapshot
+        
+        # Write all of this dataset's rows in one transaction, taken only
+        # after the comparisons so the write lock is held briefly
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for changes, from_date, to_date in pending_changes:
+                self.store_column_changes(changes, dataset_id, from_date, to_date)
+            self.store_schema_snapshots(schema_snapshots)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+# Per-process diffing instance used by the worker pool in main()
+_worker_diffing = None
+
+def _init_worker(db_path: str):
+    """Open the worker process's own diffing connection; the parent has
+    already created the tables"""
+    global _worker_diffing
+    _worker_diffing = EnhancedColumnDiffing(db_path, init_tables=False)
+
+def _process_snapshot_group(group: Tuple[str, List[Tuple]]) -> str:
+    """Process one dataset's snapshot rows inside a worker process"""
+    dataset_id, rows = group
+    _worker_diffing.process_snapshot_group(dataset_id, rows)
+    return dataset_id
 
 def main():
     """Main function to process dataset snapshots"""
     diffing = EnhancedColumnDiffing()
     
     # Get all datasets
-    conn = sqlite3.connect("datasets.db")
-    cursor = conn.cursor()
+    cursor = diffing.conn.cursor()
     
     cursor.execute('SELECT DISTINCT dataset_id FROM dataset_states LIMIT 10')
     dataset_ids = [row[0] for row in cursor.fetchall()]
     
-    conn.close()
-    
     print(f"Processing {len(dataset_ids)} datasets for column diffing...")
     
-    for dataset_id in dataset_ids:
-        print(f"Processing {dataset_id}...")
-        diffing.process_dataset_snapshots(dataset_id)
+    # Load every snapshot for the selected datasets in one pass
+    placeholders = ','.join('?' * len(dataset_ids))
+    cursor.execute(f'''
+        SELECT dataset_id, snapshot_date, schema, content_hash, row_count, column_count
+        FROM dataset_states
+        WHERE dataset_id IN ({placeholders})
+        ORDER BY dataset_id, snapshot_date ASC
+    ''', dataset_ids)
+    
+    groups = [
+        (dataset_id, [row[1:] for row in group])
+        for dataset_id, group in groupby(cursor.fetchall(), key=lambda row: row[0])
+    ]
+    
+    # Datasets are independent, so diff them in parallel. Each worker opens
+    # its own connection; SQLite still allows one writer at a time, so the
+    # workers compare concurrently and take turns on the short write
+    # transaction, with WAL keeping readers unblocked meanwhile
+    max_workers = max(1, min(len(groups), os.cpu_count() or 1))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(diffing.db_path,)) as executor:
+        for dataset_id in executor.map(_process_snapshot_group, groups):
+            print(f"Processed {dataset_id}")
     
+    # Refresh planner statistics after the bulk load
+    diffing.conn.execute("ANALYZE")
+    diffing.close()
     print("Column diffing complete!")
 
 if __name__ == "__main__":
@@ -3,27 +3,179 @@ Enhanced Diff Engine for Dataset State Historian
 Implements comprehensive diffing capabilities as specified in the complete plan
 """
 
+import base64
+import binascii
 import json
+import os
 import sqlite3
 import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 from pathlib import Path
-import pandas as pd
-from difflib import SequenceMatcher
+import numpy as np
 import Levenshtein
 
+try:
+    from rapidfuzz import process
+    from rapidfuzz.distance import Indel
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+    process = None
+    Indel = None
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
 logger = logging.getLogger(__name__)
 
+# Per-connection tuning; journal_mode=WAL itself persists in the database file
+CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA cache_size=-65536;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+"""
+
+# Snapshot key -> file name inside dataset_states/<dataset_id>/<date>/
+SNAPSHOT_FILES = {
+    'manifest': 'manifest.json',
+    'schema': 'schema.json',
+    'fingerprint': 'fingerprint.json'
+}
+
+SNAPSHOT_FILE_NAMES = frozenset(SNAPSHOT_FILES.values())
+
+# Manifest fields compared by _diff_metadata
+METADATA_FIELDS = (
+    'title', 'description', 'publisher', 'license', 'landing_page', 
+    'modified', 'agency', 'url'
+)
+
+# field_name of the enhanced_state_diffs row holding the full cached diff
+FULL_DIFF_FIELD = '__full_diff__'
+
+# Fingerprint minhashes are base64 of this many packed uint32 permutation minima
+MINHASH_NUM_PERM = 128
+
+# Bound-parameter limit of older SQLite builds (SQLITE_MAX_VARIABLE_NUMBER)
+SQLITE_MAX_VARIABLES = 999
+
+# Columns written per change_events row by _insert_change_events
+CHANGE_EVENT_COLUMN_COUNT = 8
+
+# Change type for fields whose value changed (rather than appeared or vanished)
+FIELD_CHANGE_TYPES = {
+    'license': 'policy_change',
+    'publisher': 'policy_change',
+    'landing_page': 'url_change',
+    'url': 'url_change'
+}
+
+# Metadata diff flag set when a field changes
+FIELD_CHANGE_FLAGS = {
+    'license': 'license_changed',
+    'landing_page': 'url_changed',
+    'url': 'url_changed',
+    'publisher': 'publisher_changed'
+}
+
+# Volatility fields packed into volatility_metrics.metrics_blob instead of their own columns
+VOLATILITY_DETAIL_FIELDS = (
+    'schema_churn_rate', 'content_similarity', 'license_changed', 'url_changed',
+    'publisher_changed', 'row_count_delta', 'column_count_delta'
+)
+
+# Parsed snapshots kept in memory; diffs are often re-run over overlapping dates
+SNAPSHOT_CACHE_SIZE = 512
+
+def _dumps(value: Any, sort_keys: bool = False) -> bytes:
+    """Serialize to JSON bytes, using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(value, default=str, option=option)
+    return json.dumps(value, sort_keys=sort_keys, default=str).encode()
+
+def _loads(data: Any) -> Any:
+    """Parse JSON bytes or text, using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _fast_dict_hash(value: Any) -> str:
+    """128-bit BLAKE2b hex digest of a value's sorted-key JSON encoding"""
+    return hashlib.blake2b(_dumps(value, sort_keys=True), digest_size=16).hexdigest()
+
+def _encode_diff(diff: Dict) -> Any:
+    """Serialize a full diff for diff_metadata, zstd-compressed when available"""
+    data = _dumps(diff)
+    if ZSTD_AVAILABLE:
+        return zstandard.compress(data, 3)
+    return data.decode()
+
+def _decode_diff(value: Any) -> Dict:
+    """Decode a diff_metadata value written by _encode_diff"""
+    if isinstance(value, bytes):
+        value = zstandard.decompress(value)
+    return _loads(value)
+
+class LoadedSnapshot(dict):
+    """Parsed snapshot files keyed like SNAPSHOT_FILES. Digests and other values
+    derived from them are memoized in .derived, never in the parsed payload."""
+    __slots__ = ('derived',)
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.derived = {}
+
 class EnhancedDiffEngine:
     def __init__(self, db_path: str = "datasets.db"):
         self.db_path = db_path
+        self._snapshot_cache = OrderedDict()
+        # The engine is shared by the web request threads; file reads stay outside the lock
+        self._snapshot_lock = threading.Lock()
+        self._local = threading.local()
         self.init_database()
     
+    def _conn(self) -> sqlite3.Connection:
+        """Return this thread's long-lived connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   isolation_level=None)
+            conn.executescript(CONNECTION_PRAGMAS)
+            self._local.conn = conn
+        return conn
+    
+    def close(self):
+        """Close the calling thread's database connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
     def init_database(self):
         """Initialize enhanced diff tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn()
         cursor = conn.cursor()
         
         # Enhanced state diffs table
@@ -40,11 +192,20 @@ class EnhancedDiffEngine:
                 change_magnitude REAL,
                 confidence_score REAL,
                 diff_metadata TEXT,
+                from_hash TEXT,
+                to_hash TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 UNIQUE(dataset_id, from_snapshot_date, to_snapshot_date, field_name)
             )
         ''')
         
+        # Snapshot hashes used to validate cached diffs (older databases lack them)
+        cursor.execute('PRAGMA table_info(enhanced_state_diffs)')
+        existing_columns = {row[1] for row in cursor.fetchall()}
+        for column_name in ('from_hash', 'to_hash'):
+            if column_name not in existing_columns:
+                cursor.execute(f'ALTER TABLE enhanced_state_diffs ADD COLUMN {column_name} TEXT')
+        
         # Volatility metrics table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS volatility_metrics (
@@ -60,11 +221,17 @@ class EnhancedDiffEngine:
                 row_count_delta INTEGER,
                 column_count_delta INTEGER,
                 metadata TEXT,
+                metrics_blob TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 UNIQUE(dataset_id, snapshot_date)
             )
         ''')
         
+        # Packed volatility details; metadata holds generate_diffs' change events
+        cursor.execute('PRAGMA table_info(volatility_metrics)')
+        if 'metrics_blob' not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute('ALTER TABLE volatility_metrics ADD COLUMN metrics_blob TEXT')
+        
         # Change events table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS change_events (
@@ -82,19 +249,81 @@ class EnhancedDiffEngine:
             )
         ''')
         
-        conn.commit()
-        conn.close()
+        # Back the WHERE/ORDER BY patterns of the metric and event getters
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_ve_dataset_date
+            ON volatility_metrics(dataset_id, snapshot_date DESC)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_ce_dataset_type_date
+            ON change_events(dataset_id, event_type, event_date DESC)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_vm_snapshot_date
+            ON volatility_metrics(snapshot_date DESC)
+        ''')
     
     def generate_comprehensive_diff(self, dataset_id: str, from_date: str, to_date: str) -> Dict:
         """Generate comprehensive diff between two snapshots"""
         logger.info(f"Generating comprehensive diff for {dataset_id}: {from_date} -> {to_date}")
         
+        diff_results, snapshot_hashes = self._compute_diff(dataset_id, from_date, to_date)
+        
+        # Store diff results
+        if snapshot_hashes:
+            self._store_diff_results(dataset_id, from_date, to_date, diff_results,
+                                     *snapshot_hashes)
+        
+        return diff_results
+    
+    def bulk_generate_diffs(self, pairs: List[Tuple[str, str, str]],
+                            max_workers: Optional[int] = None) -> List[Dict]:
+        """Generate diffs for many (dataset_id, from_date, to_date) triples and
+        store all of them in a single transaction"""
+        pairs = list(pairs)
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = max(1, min(max_workers, len(pairs)))
+        
+        # Diffing is CPU-bound (JSON parsing, rename matching), so fan out to processes
+        if max_workers > 1:
+            chunksize = max(1, len(pairs) // (max_workers * 4))
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(self.db_path,)) as executor:
+                computed = list(executor.map(_compute_diff_worker, pairs, chunksize=chunksize))
+        else:
+            computed = [self._compute_diff(*pair) for pair in pairs]
+        
+        results = []
+        pending = []
+        
+        for (dataset_id, from_date, to_date), (diff_results, snapshot_hashes) in zip(pairs, computed):
+            results.append(diff_results)
+            if snapshot_hashes:
+                pending.append((dataset_id, from_date, to_date, diff_results) + snapshot_hashes)
+        
+        self._store_diff_batch(pending)
+        
+        logger.info(f"Generated {len(results)} diffs ({len(pending)} newly computed)")
+        return results
+    
+    def _compute_diff(self, dataset_id: str, from_date: str,
+                      to_date: str) -> Tuple[Dict, Optional[Tuple[str, str]]]:
+        """Diff two snapshots without storing anything; the snapshot hashes are
+        returned only when the diff was freshly computed and needs storing"""
         # Load snapshots
         from_snapshot = self._load_snapshot(dataset_id, from_date)
         to_snapshot = self._load_snapshot(dataset_id, to_date)
         
         if not from_snapshot or not to_snapshot:
-            return {'error': 'Missing snapshot data'}
+            return {'error': 'Missing snapshot data'}, None
+        
+        # Reuse the stored diff when neither snapshot has changed since it was computed
+        from_hash = self._snapshot_digest(from_snapshot)
+        to_hash = self._snapshot_digest(to_snapshot)
+        cached_diff = self._load_cached_diff(dataset_id, from_date, to_date, from_hash, to_hash)
+        if cached_diff is not None:
+            return cached_diff, None
         
         # Generate different types of diffs
         metadata_diff = self._diff_metadata(from_snapshot, to_snapshot)
@@ -111,16 +340,7 @@ class EnhancedDiffEngine:
             dataset_id, to_date, metadata_diff, schema_diff, content_diff
         )
         
-        # Store diff results
-        self._store_diff_results(dataset_id, from_date, to_date, {
-            'metadata_diff': metadata_diff,
-            'schema_diff': schema_diff,
-            'content_diff': content_diff,
-            'volatility_metrics': volatility_metrics,
-            'change_events': change_events
-        })
-        
-        return {
+        diff_results = {
             'dataset_id': dataset_id,
             'from_date': from_date,
             'to_date': to_date,
@@ -131,33 +351,71 @@ class EnhancedDiffEngine:
             'change_events': change_events,
             'summary': self._generate_diff_summary(metadata_diff, schema_diff, content_diff)
         }
+        
+        return diff_results, (from_hash, to_hash)
     
-    def _load_snapshot(self, dataset_id: str, snapshot_date: str) -> Optional[Dict]:
-        """Load snapshot data from file system"""
-        snapshot_dir = Path(f"dataset_states/{dataset_id}/{snapshot_date}")
+    def _snapshot_digest(self, snapshot: LoadedSnapshot) -> str:
+        """Digest of the snapshot file bytes read from disk by _load_snapshot"""
+        return snapshot.derived['snapshot_hash']
+    
+    def _load_cached_diff(self, dataset_id: str, from_date: str, to_date: str,
+                          from_hash: str, to_hash: str) -> Optional[Dict]:
+        """Return a previously stored diff if it was computed from the same snapshots"""
+        row = self._conn().execute('''
+            SELECT diff_metadata FROM enhanced_state_diffs
+            WHERE dataset_id = ? AND from_snapshot_date = ? AND to_snapshot_date = ?
+              AND field_name = ? AND from_hash = ? AND to_hash = ?
+        ''', (dataset_id, from_date, to_date, FULL_DIFF_FIELD, from_hash, to_hash)).fetchone()
         
-        if not snapshot_dir.exists():
+        if not row or not row[0]:
             return None
+        return _decode_diff(row[0])
+    
+    def _load_snapshot(self, dataset_id: str, snapshot_date: str) -> Optional[LoadedSnapshot]:
+        """Load snapshot data from file system (LRU-cached per dataset/date, and
+        re-read whenever a snapshot file has been rewritten since it was cached)"""
+        snapshot_dir = f"dataset_states/{dataset_id}/{snapshot_date}"
         
-        snapshot = {}
+        # One directory scan instead of an exists() check per file; the
+        # files' stat results identify the version a cached entry was read from
+        try:
+            with os.scandir(snapshot_dir) as entries:
+                paths = {}
+                stamp = []
+                for entry in entries:
+                    if entry.name in SNAPSHOT_FILE_NAMES:
+                        stat = entry.stat()
+                        paths[entry.name] = entry.path
+                        stamp.append((entry.name, stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            return None
+        stamp = tuple(sorted(stamp))
         
-        # Load manifest
-        manifest_file = snapshot_dir / 'manifest.json'
-        if manifest_file.exists():
-            with open(manifest_file, 'r') as f:
-                snapshot['manifest'] = json.load(f)
+        cache_key = (dataset_id, snapshot_date)
+        with self._snapshot_lock:
+            cached = self._snapshot_cache.get(cache_key)
+            if cached is not None and cached[0] == stamp:
+                self._snapshot_cache.move_to_end(cache_key)
+                return cached[1]
         
-        # Load schema
-        schema_file = snapshot_dir / 'schema.json'
-        if schema_file.exists():
-            with open(schema_file, 'r') as f:
-                snapshot['schema'] = json.load(f)
+        # The digest covers the exact bytes parsed, so a stored diff is only
+        # reused for the file contents it was computed from
+        snapshot = LoadedSnapshot()
+        hasher = hashlib.blake2b(digest_size=16)
+        for key, filename in SNAPSHOT_FILES.items():
+            path = paths.get(filename)
+            if path:
+                data = Path(path).read_bytes()
+                hasher.update(f'{filename}:{len(data)}:'.encode())
+                hasher.update(data)
+                snapshot[key] = _loads(data)
+        snapshot.derived['snapshot_hash'] = hasher.hexdigest()
         
-        # Load fingerprint
-        fingerprint_file = snapshot_dir / 'fingerprint.json'
-        if fingerprint_file.exists():
-            with open(fingerprint_file, 'r') as f:
-                snapshot['fingerprint'] = json.load(f)
+        with self._snapshot_lock:
+            self._snapshot_cache[cache_key] = (stamp, snapshot)
+            self._snapshot_cache.move_to_end(cache_key)
+            if len(self._snapshot_cache) > SNAPSHOT_CACHE_SIZE:
+                self._snapshot_cache.popitem(last=False)
         
         return snapshot
     
@@ -174,41 +432,68 @@ class EnhancedDiffEngine:
             'publisher_changed': False
         }
         
-        # Fields to compare
-        fields_to_compare = [
-            'title', 'description', 'publisher', 'license', 'landing_page', 
-            'modified', 'agency', 'url'
-        ]
+        # Identical manifests (the common case for re-scans) cannot differ in any field
+        if self._manifest_digest(from_snapshot) == self._manifest_digest(to_snapshot):
+            metadata_diff['unchanged'] = list(METADATA_FIELDS)
+            return metadata_diff
         
-        for field in fields_to_compare:
+        for field in METADATA_FIELDS:
             old_value = from_meta.get(field, '')
             new_value = to_meta.get(field, '')
             
             if old_value != new_value:
-                change = {
+                # Classify the type of change
+                if not old_value:
+                    change_type = 'added'
+                elif not new_value:
+                    change_type = 'removed'
+                else:
+                    change_type = FIELD_CHANGE_TYPES.get(field, 'modified')
+                
+                metadata_diff['changes'].append({
                     'field': field,
                     'old_value': old_value,
                     'new_value': new_value,
-                    'change_type': self._classify_change_type(field, old_value, new_value)
-                }
-                metadata_diff['changes'].append(change)
+                    'change_type': change_type
+                })
                 
                 # Track specific changes
-                if field == 'license':
-                    metadata_diff['license_changed'] = True
-                elif field in ['landing_page', 'url']:
-                    metadata_diff['url_changed'] = True
-                elif field == 'publisher':
-                    metadata_diff['publisher_changed'] = True
+                flag = FIELD_CHANGE_FLAGS.get(field)
+                if flag:
+                    metadata_diff[flag] = True
             else:
                 metadata_diff['unchanged'].append(field)
         
         return metadata_diff
     
+    def _manifest_digest(self, snapshot: LoadedSnapshot) -> str:
+        """Digest of a snapshot's manifest, computed once per loaded snapshot"""
+        digest = snapshot.derived.get('manifest_hash')
+        if digest is None:
+            manifest = snapshot.get('manifest', {})
+            digest = manifest.get('manifest_hash') or _fast_dict_hash(manifest)
+            snapshot.derived['manifest_hash'] = digest
+        return digest
+    
     def _diff_schema(self, from_snapshot: Dict, to_snapshot: Dict) -> Dict:
         """Compare schema between snapshots"""
         from_schema = from_snapshot.get('schema', {})
         to_schema = to_snapshot.get('schema', {})
+        row_count_delta = to_schema.get('row_count', 0) - from_schema.get('row_count', 0)
+        column_count_delta = to_schema.get('column_count', 0) - from_schema.get('column_count', 0)
+        
+        # Same column set: no added/removed columns and nothing to rename-match
+        if self._columns_digest(from_snapshot) == self._columns_digest(to_snapshot):
+            common_columns = from_snapshot.derived['sorted_columns']
+            return {
+                'added_columns': [],
+                'removed_columns': [],
+                'renamed_columns': [],
+                'common_columns': list(common_columns),
+                'churn_rate': 0.0 if common_columns else 0,
+                'row_count_delta': row_count_delta,
+                'column_count_delta': column_count_delta
+            }
         
         from_columns = set(from_schema.get('columns', []))
         to_columns = set(to_schema.get('columns', []))
@@ -219,7 +504,8 @@ class EnhancedDiffEngine:
         
         # Check for column renames
         renamed_columns = self._detect_column_renames(
-            from_columns, to_columns, from_schema, to_schema
+            from_columns, to_columns, from_schema, to_schema,
+            self._lowered_columns(from_snapshot), self._lowered_columns(to_snapshot)
         )
         
         # Calculate schema churn rate
@@ -233,10 +519,35 @@ class EnhancedDiffEngine:
             'renamed_columns': renamed_columns,
             'common_columns': list(common_columns),
             'churn_rate': churn_rate,
-            'row_count_delta': to_schema.get('row_count', 0) - from_schema.get('row_count', 0),
-            'column_count_delta': to_schema.get('column_count', 0) - from_schema.get('column_count', 0)
+            'row_count_delta': row_count_delta,
+            'column_count_delta': column_count_delta
         }
     
+    def _lowered_columns(self, snapshot: LoadedSnapshot) -> Dict[str, str]:
+        """Column name -> lowercased name, taken from the schema's columns_lower
+        when the snapshot writer provides it, otherwise lowered once per snapshot"""
+        lowered = snapshot.derived.get('lowered_columns')
+        if lowered is None:
+            schema = snapshot.get('schema', {})
+            columns = schema.get('columns', [])
+            columns_lower = schema.get('columns_lower')
+            if not columns_lower or len(columns_lower) != len(columns):
+                columns_lower = [col.lower() for col in columns]
+            lowered = dict(zip(columns, columns_lower))
+            snapshot.derived['lowered_columns'] = lowered
+        return lowered
+    
+    def _columns_digest(self, snapshot: LoadedSnapshot) -> str:
+        """Digest of a snapshot's sorted column set, computed once per loaded snapshot"""
+        digest = snapshot.derived.get('columns_hash')
+        if digest is None:
+            schema = snapshot.get('schema', {})
+            sorted_columns = tuple(sorted(set(schema.get('columns', [])), key=str))
+            digest = _fast_dict_hash(sorted_columns)
+            snapshot.derived['sorted_columns'] = sorted_columns
+            snapshot.derived['columns_hash'] = digest
+        return digest
+    
     def _diff_content(self, from_snapshot: Dict, to_snapshot: Dict) -> Dict:
         """Compare content between snapshots"""
         from_fingerprint = from_snapshot.get('fingerprint', {})
@@ -259,17 +570,58 @@ class EnhancedDiffEngine:
         }
     
     def _detect_column_renames(self, from_columns: set, to_columns: set, 
-                              from_schema: Dict, to_schema: Dict) -> List[Dict]:
+                              from_schema: Dict, to_schema: Dict,
+                              from_lower: Dict[str, str] = None,
+                              to_lower: Dict[str, str] = None) -> List[Dict]:
         """Detect column renames using Levenshtein distance"""
+        removed = list(from_columns - to_columns)
+        added = list(to_columns - from_columns)
+        if not removed or not added:
+            return []
+        
+        if from_lower is not None and to_lower is not None:
+            removed_lower = [from_lower[col] for col in removed]
+            added_lower = [to_lower[col] for col in added]
+        else:
+            removed_lower = [col.lower() for col in removed]
+            added_lower = [col.lower() for col in added]
+        
+        if not RAPIDFUZZ_AVAILABLE:
+            return self._detect_column_renames_pairwise(removed, added,
+                                                        removed_lower, added_lower)
+        
+        # Full removed x added similarity matrix in one call; Indel's
+        # normalized similarity is the same measure as Levenshtein.ratio
+        scores = process.cdist(removed_lower, added_lower,
+                               scorer=Indel.normalized_similarity,
+                               score_cutoff=0.7, dtype=np.float64)
+        best_indices = scores.argmax(axis=1)
+        
+        renamed = []
+        for i, j in enumerate(best_indices):
+            score = float(scores[i, j])
+            if score > 0.7:
+                renamed.append({
+                    'old_name': removed[i],
+                    'new_name': added[j],
+                    'similarity': score
+                })
+        
+        return renamed
+    
+    def _detect_column_renames_pairwise(self, removed: List[str], added: List[str],
+                                        removed_lower: List[str],
+                                        added_lower: List[str]) -> List[Dict]:
+        """Pairwise Levenshtein fallback when rapidfuzz is not installed"""
         renamed = []
         
         # Find potential renames by similarity
-        for from_col in from_columns - to_columns:
+        for from_col, from_lower in zip(removed, removed_lower):
             best_match = None
             best_similarity = 0
             
-            for to_col in to_columns - from_columns:
-                similarity = Levenshtein.ratio(from_col.lower(), to_col.lower())
+            for to_col, to_lower in zip(added, added_lower):
+                similarity = Levenshtein.ratio(from_lower, to_lower)
                 if similarity > 0.7 and similarity > best_similarity:
                     best_match = to_col
                     best_similarity = similarity
@@ -295,26 +647,70 @@ class EnhancedDiffEngine:
         if from_minhash == to_minhash:
             return 1.0
         
-        # Calculate actual similarity using content hashes and structure
-        # In production, this would use proper minhash comparison
+        # Estimated Jaccard: fraction of permutations whose minima agree
+        from_signature = self._unpack_minhash(from_minhash)
+        to_signature = self._unpack_minhash(to_minhash)
+        if from_signature is not None and to_signature is not None:
+            return float(np.count_nonzero(from_signature == to_signature)) / from_signature.size
+        
+        # Legacy fingerprints (e.g. a single content hash) carry no signature to compare
         return 0.9
     
+    def _unpack_minhash(self, minhash: Any) -> Optional[np.ndarray]:
+        """Decode a base64 packed uint32 minhash signature, or None if it isn't one"""
+        if not isinstance(minhash, str):
+            return None
+        try:
+            packed = base64.b64decode(minhash, validate=True)
+        except (binascii.Error, ValueError):
+            return None
+        if len(packed) != MINHASH_NUM_PERM * 4:
+            return None
+        return np.frombuffer(packed, dtype=np.uint32)
+    
     def _compare_quantiles(self, from_quantiles: Dict, to_quantiles: Dict) -> Dict:
         """Compare quantile statistics between snapshots"""
-        changes = {}
-        
-        for field in set(from_quantiles.keys()) | set(to_quantiles.keys()):
+        changed = []
+        for field in from_quantiles.keys() | to_quantiles.keys():
             from_q = from_quantiles.get(field, {})
             to_q = to_quantiles.get(field, {})
-            
             if from_q != to_q:
-                changes[field] = {
-                    'old_quantiles': from_q,
-                    'new_quantiles': to_q,
-                    'change_magnitude': self._calculate_quantile_change_magnitude(from_q, to_q)
-                }
+                changed.append((field, from_q, to_q))
+        
+        if not changed:
+            return {}
+        
+        try:
+            magnitudes = self._quantile_change_magnitudes(changed)
+        except (TypeError, ValueError):
+            # Non-numeric medians: fall back to the per-field calculation
+            magnitudes = [self._calculate_quantile_change_magnitude(from_q, to_q)
+                          for _, from_q, to_q in changed]
+        
+        return {
+            field: {
+                'old_quantiles': from_q,
+                'new_quantiles': to_q,
+                'change_magnitude': magnitude
+            }
+            for (field, from_q, to_q), magnitude in zip(changed, magnitudes)
+        }
+    
+    def _quantile_change_magnitudes(self, changed: List[Tuple[str, Dict, Dict]]) -> List[float]:
+        """Vectorized _calculate_quantile_change_magnitude over all changed fields"""
+        # Missing quantiles may be None rather than {}; those fields score 1.0 below
+        from_median = np.array([(from_q or {}).get('0.5', 0) for _, from_q, _ in changed],
+                               dtype=np.float64)
+        to_median = np.array([(to_q or {}).get('0.5', 0) for _, _, to_q in changed],
+                             dtype=np.float64)
+        missing = np.array([not from_q or not to_q for _, from_q, to_q in changed])
         
-        return changes
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relative = np.abs(to_median - from_median) / np.abs(from_median)
+        magnitudes = np.where(from_median == 0, (to_median != 0).astype(np.float64), relative)
+        magnitudes = np.where(missing, 1.0, magnitudes)
+        
+        return magnitudes.tolist()
     
     def _calculate_quantile_change_magnitude(self, from_q: Dict, to_q: Dict) -> float:
         """Calculate magnitude of quantile changes"""
@@ -331,19 +727,6 @@ class EnhancedDiffEngine:
         
         return abs(to_median - from_median) / abs(from_median)
     
-    def _classify_change_type(self, field: str, old_value: str, new_value: str) -> str:
-        """Classify the type of change"""
-        if not old_value and new_value:
-            return 'added'
-        elif old_value and not new_value:
-            return 'removed'
-        elif field in ['license', 'publisher']:
-            return 'policy_change'
-        elif field in ['landing_page', 'url']:
-            return 'url_change'
-        else:
-            return 'modified'
-    
     def _calculate_volatility_metrics(self, dataset_id: str, from_snapshot: Dict, 
                                     to_snapshot: Dict, metadata_diff: Dict, 
                                     schema_diff: Dict, content_diff: Dict) -> Dict:
@@ -381,26 +764,29 @@ class EnhancedDiffEngine:
                               content_diff: Dict) -> List[Dict]:
         """Generate change events from diffs"""
         events = []
+        changes_by_field = {c['field']: c for c in metadata_diff['changes']}
         
         # License change event
         if metadata_diff.get('license_changed'):
+            license_change = changes_by_field.get('license', {})
             events.append({
                 'event_type': 'license_change',
                 'event_description': 'Dataset license changed',
                 'severity': 'medium',
-                'old_value': next((c['old_value'] for c in metadata_diff['changes'] if c['field'] == 'license'), ''),
-                'new_value': next((c['new_value'] for c in metadata_diff['changes'] if c['field'] == 'license'), ''),
+                'old_value': license_change.get('old_value', ''),
+                'new_value': license_change.get('new_value', ''),
                 'confidence_score': 1.0
             })
         
-        # URL change event
+        # URL change event (landing_page takes precedence over url)
         if metadata_diff.get('url_changed'):
+            url_change = changes_by_field.get('landing_page') or changes_by_field.get('url', {})
             events.append({
                 'event_type': 'url_change',
                 'event_description': 'Dataset URL changed',
                 'severity': 'high',
-                'old_value': next((c['old_value'] for c in metadata_diff['changes'] if c['field'] in ['landing_page', 'url']), ''),
-                'new_value': next((c['new_value'] for c in metadata_diff['changes'] if c['field'] in ['landing_page', 'url']), ''),
+                'old_value': url_change.get('old_value', ''),
+                'new_value': url_change.get('new_value', ''),
                 'confidence_score': 1.0
             })
         
@@ -429,62 +815,102 @@ class EnhancedDiffEngine:
         return events
     
     def _store_diff_results(self, dataset_id: str, from_date: str, to_date: str, 
-                          diff_results: Dict):
+                          diff_results: Dict, from_hash: str = None, to_hash: str = None):
         """Store diff results in database"""
-        conn = sqlite3.connect(self.db_path)
+        self._store_diff_batch([(dataset_id, from_date, to_date, diff_results,
+                                 from_hash, to_hash)])
+    
+    def _store_diff_batch(self, pending: List[Tuple]):
+        """Store (dataset_id, from_date, to_date, diff_results, from_hash, to_hash)
+        entries in one transaction"""
+        if not pending:
+            return
+        
+        metadata_rows = []
+        full_diff_rows = []
+        volatility_rows = []
+        event_rows = []
+        
+        for dataset_id, from_date, to_date, diff_results, from_hash, to_hash in pending:
+            metadata_rows.extend(
+                (dataset_id, from_date, to_date, 'metadata',
+                 change['field'], change['old_value'], change['new_value'], 1.0, 1.0)
+                for change in diff_results['metadata_diff']['changes']
+            )
+            full_diff_rows.append((
+                dataset_id, from_date, to_date, 'comprehensive',
+                FULL_DIFF_FIELD, _encode_diff(diff_results), from_hash, to_hash
+            ))
+            volatility = diff_results['volatility_metrics']
+            details = {field: volatility[field] for field in VOLATILITY_DETAIL_FIELDS}
+            # Keep the types the REAL/BOOLEAN columns used to coerce to
+            for field in ('schema_churn_rate', 'content_similarity'):
+                details[field] = float(details[field])
+            for flag in ('license_changed', 'url_changed', 'publisher_changed'):
+                details[flag] = int(details[flag])
+            volatility_rows.append((
+                dataset_id, to_date, volatility['volatility_score'],
+                _dumps(details).decode()
+            ))
+            event_rows.extend(
+                (dataset_id, to_date, event['event_type'],
+                 event['event_description'], event['severity'],
+                 event['old_value'], event['new_value'], event['confidence_score'])
+                for event in diff_results['change_events']
+            )
+        
+        conn = self._conn()
         cursor = conn.cursor()
         
         try:
+            cursor.execute('BEGIN IMMEDIATE')
+            
             # Store enhanced state diffs
-            for change in diff_results['metadata_diff']['changes']:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO enhanced_state_diffs 
-                    (dataset_id, from_snapshot_date, to_snapshot_date, diff_type, 
-                     field_name, old_value, new_value, change_magnitude, confidence_score)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    dataset_id, from_date, to_date, 'metadata',
-                    change['field'], change['old_value'], change['new_value'],
-                    1.0, 1.0
-                ))
+            cursor.executemany('''
+                INSERT OR REPLACE INTO enhanced_state_diffs 
+                (dataset_id, from_snapshot_date, to_snapshot_date, diff_type, 
+                 field_name, old_value, new_value, change_magnitude, confidence_score)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', metadata_rows)
             
-            # Store volatility metrics
-            volatility = diff_results['volatility_metrics']
-            cursor.execute('''
+            # Store the full diff so unchanged snapshot pairs can skip recomputation
+            cursor.executemany('''
+                INSERT OR REPLACE INTO enhanced_state_diffs 
+                (dataset_id, from_snapshot_date, to_snapshot_date, diff_type, 
+                 field_name, diff_metadata, from_hash, to_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', full_diff_rows)
+            
+            # Store volatility metrics (detail fields packed into metrics_blob)
+            cursor.executemany('''
                 INSERT OR REPLACE INTO volatility_metrics 
-                (dataset_id, snapshot_date, volatility_score, schema_churn_rate, 
-                 content_similarity, license_changed, url_changed, publisher_changed,
-                 row_count_delta, column_count_delta)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                dataset_id, to_date, volatility['volatility_score'],
-                volatility['schema_churn_rate'], volatility['content_similarity'],
-                volatility['license_changed'], volatility['url_changed'],
-                volatility['publisher_changed'], volatility['row_count_delta'],
-                volatility['column_count_delta']
-            ))
+                (dataset_id, snapshot_date, volatility_score, metrics_blob)
+                VALUES (?, ?, ?, ?)
+            ''', volatility_rows)
             
             # Store change events
-            for event in diff_results['change_events']:
-                cursor.execute('''
-                    INSERT INTO change_events 
-                    (dataset_id, event_date, event_type, event_description, 
-                     severity, old_value, new_value, confidence_score)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    dataset_id, to_date, event['event_type'],
-                    event['event_description'], event['severity'],
-                    event['old_value'], event['new_value'],
-                    event['confidence_score']
-                ))
+            self._insert_change_events(cursor, event_rows)
             
             conn.commit()
             
         except Exception as e:
             logger.error(f"Failed to store diff results: {e}")
             conn.rollback()
-        finally:
-            conn.close()
+    
+    def _insert_change_events(self, cursor: sqlite3.Cursor, event_rows: List[Tuple]):
+        """Insert change events with multi-row VALUES statements, chunked to stay
+        under SQLite's bound-parameter limit"""
+        rows_per_statement = SQLITE_MAX_VARIABLES // CHANGE_EVENT_COLUMN_COUNT
+        row_placeholder = '(' + ', '.join(['?'] * CHANGE_EVENT_COLUMN_COUNT) + ')'
+        
+        for start in range(0, len(event_rows), rows_per_statement):
+            chunk = event_rows[start:start + rows_per_statement]
+            cursor.execute(f'''
+                INSERT INTO change_events 
+                (dataset_id, event_date, event_type, event_description, 
+                 severity, old_value, new_value, confidence_score)
+                VALUES {', '.join([row_placeholder] * len(chunk))}
+            ''', [value for row in chunk for value in row])
     
     def _generate_diff_summary(self, metadata_diff: Dict, schema_diff: Dict, 
                              content_diff: Dict) -> Dict:
@@ -525,9 +951,34 @@ class EnhancedDiffEngine:
         else:
             return 'low'
     
-    def get_volatility_metrics(self, dataset_id: str = None) -> List[Dict]:
+    def _iter_rows(self, cursor: sqlite3.Cursor, transform=None) -> Iterator[Dict]:
+        """Yield result rows as dicts, closing the cursor once exhausted or abandoned"""
+        try:
+            columns = [description[0] for description in cursor.description]
+            for row in cursor:
+                record = dict(zip(columns, row))
+                yield transform(record) if transform else record
+        finally:
+            cursor.close()
+    
+    def _expand_volatility_row(self, record: Dict) -> Dict:
+        """Fill a volatility row's detail fields from its packed metrics_blob"""
+        metrics_blob = record.pop('metrics_blob', None)
+        if not metrics_blob:
+            return record
+        try:
+            details = _loads(metrics_blob)
+        except ValueError:
+            return record
+        if isinstance(details, dict):
+            for field in VOLATILITY_DETAIL_FIELDS:
+                if record.get(field) is None and field in details:
+                    record[field] = details[field]
+        return record
+    
+    def get_volatility_metrics(self, dataset_id: str = None) -> Iterator[Dict]:
         """Get volatility metrics for dataset(s)"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn()
         cursor = conn.cursor()
         
         if dataset_id:
@@ -543,15 +994,11 @@ class EnhancedDiffEngine:
                 LIMIT 100
             ''')
         
-        columns = [description[0] for description in cursor.description]
-        metrics = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
-        conn.close()
-        return metrics
+        return self._iter_rows(cursor, self._expand_volatility_row)
     
-    def get_change_events(self, dataset_id: str = None, event_type: str = None) -> List[Dict]:
+    def get_change_events(self, dataset_id: str = None, event_type: str = None) -> Iterator[Dict]:
         """Get change events for dataset(s)"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn()
         cursor = conn.cursor()
         
         query = 'SELECT * FROM change_events WHERE 1=1'
@@ -568,11 +1015,38 @@ class EnhancedDiffEngine:
         query += ' ORDER BY event_date DESC'
         
         cursor.execute(query, params)
-        columns = [description[0] for description in cursor.description]
-        events = [dict(zip(columns, row)) for row in cursor.fetchall()]
         
-        conn.close()
-        return events
+        return self._iter_rows(cursor)
+
+# Per-process engine used by bulk_generate_diffs workers
+_worker_engine = None
+
+def _init_worker(db_path: str):
+    """Open the worker process's own engine and connection"""
+    global _worker_engine
+    _worker_engine = EnhancedDiffEngine(db_path)
+
+def _compute_diff_worker(pair: Tuple[str, str, str]) -> Tuple[Dict, Optional[Tuple[str, str]]]:
+    """Compute one (dataset_id, from_date, to_date) diff inside a worker process"""
+    return _worker_engine._compute_diff(*pair)
+
+def _snapshot_pairs(dataset_id: str = None) -> List[Tuple[str, str, str]]:
+    """Consecutive (dataset_id, from_date, to_date) snapshot pairs under dataset_states/"""
+    root = Path('dataset_states')
+    if dataset_id:
+        dataset_dirs = [root / dataset_id]
+    else:
+        dataset_dirs = sorted(path for path in root.iterdir() if path.is_dir()) if root.is_dir() else []
+    
+    pairs = []
+    for dataset_dir in dataset_dirs:
+        if not dataset_dir.is_dir():
+            continue
+        dates = sorted(path.name for path in dataset_dir.iterdir() if path.is_dir())
+        pairs.extend((dataset_dir.name, from_date, to_date)
+                     for from_date, to_date in zip(dates, dates[1:]))
+    
+    return pairs
 
 def main():
     """Test enhanced diff engine"""
@@ -584,6 +1058,9 @@ def main():
     parser.add_argument('--to-date', help='To date')
     parser.add_argument('--volatility', action='store_true', help='Show volatility metrics')
     parser.add_argument('--events', action='store_true', help='Show change events')
+    parser.add_argument('--backfill', action='store_true',
+                        help='Diff every consecutive snapshot pair (of --dataset-id, or all datasets)')
+    parser.add_argument('--workers', type=int, help='Worker processes for --backfill')
     
     args = parser.parse_args()
     
@@ -593,19 +1070,31 @@ def main():
     
     if args.volatility:
         metrics = engine.get_volatility_metrics(args.dataset_id)
-        print(f"Volatility metrics: {len(metrics)}")
-        for metric in metrics[:5]:
+        shown = list(islice(metrics, 5))
+        print(f"Volatility metrics: {len(shown) + sum(1 for _ in metrics)}")
+        for metric in shown:
             print(f"  {metric['dataset_id']}: volatility={metric['volatility_score']:.2f}")
     
     elif args.events:
         events = engine.get_change_events(args.dataset_id)
-        print(f"Change events: {len(events)}")
-        for event in events[:5]:
+        shown = list(islice(events, 5))
+        print(f"Change events: {len(shown) + sum(1 for _ in events)}")
+        for event in shown:
             print(f"  {event['event_type']}: {event['event_description']}")
     
+    elif args.backfill:
+        pairs = _snapshot_pairs(args.dataset_id)
+        diffs = engine.bulk_generate_diffs(pairs, max_workers=args.workers)
+        errors = sum(1 for diff in diffs if 'error' in diff)
+        print(f"Backfilled {len(diffs)} diffs ({errors} with missing snapshots)")
+    
     elif args.dataset_id and args.from_date and args.to_date:
         diff = engine.generate_comprehensive_diff(args.dataset_id, args.from_date, args.to_date)
-        print(json.dumps(diff, indent=2, default=str))
+        if ORJSON_AVAILABLE:
+            print(orjson.dumps(diff, default=str,
+                               option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY).decode())
+        else:
+            print(json.dumps(diff, indent=2, default=str))
 
 if __name__ == '__main__':
     main()
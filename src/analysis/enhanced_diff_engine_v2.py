@@ -7,19 +7,130 @@ Implements the full diff specification from the plan
 import json
 import sqlite3
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple, Union
+from dataclasses import dataclass, asdict, is_dataclass
 from enum import Enum
-import hashlib
-import re
-from difflib import SequenceMatcher
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
+import numpy as np
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in so the kernels run as plain Python"""
+        return lambda func: func
+
+# Applied once to the engine's long-lived connection
+CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA cache_size=-65536;
+    PRAGMA temp_store=MEMORY;
+"""
+
+# SQLite's default limit on bound parameters per statement
+SQLITE_MAX_VARIABLES = 999
+
+# Hot-path statements, shared so every call hands sqlite3's statement cache the same text
+_SQL_FETCH_SNAPSHOTS = '''
+    SELECT DATE(created_at) AS snapshot_day, * FROM dataset_states
+    WHERE dataset_id = ? AND DATE(created_at) IN (?, ?)
+    ORDER BY created_at DESC
+'''
+
+_SQL_UPSERT_DIFF = '''
+    INSERT INTO dataset_diffs
+    (dataset_id, from_date, to_date, metadata_changes, schema_changes,
+     content_changes, signals, severity, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(dataset_id, from_date, to_date) DO UPDATE SET
+        metadata_changes = excluded.metadata_changes,
+        schema_changes = excluded.schema_changes,
+        content_changes = excluded.content_changes,
+        signals = excluded.signals,
+        severity = excluded.severity,
+        created_at = excluded.created_at
+'''
+
+_SQL_GET_DIFF_ID = '''
+    SELECT id FROM dataset_diffs
+    WHERE dataset_id = ? AND from_date = ? AND to_date = ?
+'''
+
+_SQL_DELETE_FIELD_CHANGES = 'DELETE FROM field_changes WHERE diff_id = ?'
+
+_SQL_INSERT_FIELD_CHANGE = '''
+    INSERT INTO field_changes
+    (diff_id, field_name, old_value, new_value, change_type, confidence)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+_SQL_GET_DIFF = '''
+    SELECT * FROM dataset_diffs
+    WHERE dataset_id = ? AND from_date = ? AND to_date = ?
+'''
+
+_SQL_LIST_DIFFS = '''
+    SELECT * FROM dataset_diffs
+    WHERE dataset_id = ?
+    ORDER BY to_date DESC
+    LIMIT ?
+'''
+
+# Metadata fields tracked between snapshots, in reporting order
+METADATA_FIELDS = (
+    'title',
+    'agency',
+    'url',
+    'availability',
+    'last_modified',
+    'dimension_computation_time_ms'
+)
+_get_metadata = itemgetter(*METADATA_FIELDS)
+
+# Snapshot fields feeding the content similarity score
+CONTENT_FIELDS = ('row_count', 'column_count', 'response_time_ms')
+
+# Signals reported on every diff, all False until raised
+SIGNAL_NAMES = ('major_change', 'license_flip', 'url_moved', 'schema_shrink', 'content_drift', 'row_count_spike')
+
+# Severity points per metadata (field, change_type); any other change scores 1
+METADATA_SEVERITY_WEIGHTS = {
+    ('availability', 'modified'): 3,  # High severity for availability changes
+    ('url', 'modified'): 2  # Medium-high for URL changes
+}
+
+# Severity points added by each raised signal
+SIGNAL_SEVERITY_WEIGHTS = {
+    'license_flip': 2,
+    'url_moved': 1,
+    'schema_shrink': 2,
+    'content_drift': 2
+}
+
+# Minimum score for each severity level, highest first
+SEVERITY_LEVELS = ((5, 'high'), (3, 'medium'), (0, 'low'))
 
 class ChangeType(Enum):
     METADATA = "metadata"
     SCHEMA = "schema"
     CONTENT = "content"
 
-@dataclass
+@dataclass(slots=True)
 class FieldChange:
     field: str
     old_value: Any
@@ -27,7 +138,7 @@ class FieldChange:
     change_type: str  # "added", "removed", "modified", "renamed"
     confidence: float = 1.0
 
-@dataclass
+@dataclass(slots=True)
 class SchemaChange:
     added_columns: List[str]
     removed_columns: List[str]
@@ -35,7 +146,7 @@ class SchemaChange:
     dtype_changes: List[Dict[str, str]]  # [{"column": "release_lbs", "from": "integer", "to": "number"}]
     row_delta: int
 
-@dataclass
+@dataclass(slots=True)
 class ContentChange:
     dataset_similarity: float
     columns_changed: List[str]
@@ -43,7 +154,7 @@ class ContentChange:
     row_count_delta: int
     content_hash_changed: bool
 
-@dataclass
+@dataclass(slots=True)
 class DiffResult:
     dataset_id: str
     from_date: str
@@ -55,17 +166,162 @@ class DiffResult:
     severity: str
     created_at: datetime
 
+def _metadata_values(snapshot: Dict) -> Tuple:
+    """All METADATA_FIELDS of a snapshot in one call; missing fields read as None"""
+    try:
+        return _get_metadata(snapshot)
+    except KeyError:
+        return tuple(map(snapshot.get, METADATA_FIELDS))
+
+def _content_values(snapshot: Dict) -> Tuple:
+    """CONTENT_FIELDS of a snapshot; missing fields read as 0"""
+    return tuple(snapshot.get(field, 0) for field in CONTENT_FIELDS)
+
+def _json_default(value: Any) -> Any:
+    """Serialize the diff dataclasses for stdlib json"""
+    if is_dataclass(value):
+        return asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _dumps(value: Any) -> str:
+    """Serialize to JSON text, using orjson (which handles dataclasses natively) when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, default=_json_default)
+
+@njit(cache=True, nogil=True)
+def _ratio_similarity(a, b):
+    """min(a, b) / max(a, b), or 1.0 when neither side is positive"""
+    larger = a if a > b else b
+    if larger <= 0:
+        return 1.0
+    return (a if a < b else b) / larger
+
+@njit(cache=True, nogil=True)
+def _similarity_kernel(from_rows, to_rows, from_cols, to_cols, from_response, to_response):
+    """Weighted row/column/response time similarity of two snapshots"""
+    if from_rows == 0 and to_rows == 0:
+        return 1.0
+    
+    if from_rows == 0 or to_rows == 0:
+        return 0.0
+    
+    row_similarity = _ratio_similarity(from_rows, to_rows)
+    col_similarity = _ratio_similarity(from_cols, to_cols)
+    response_similarity = _ratio_similarity(from_response, to_response)
+    
+    return (row_similarity * 0.5 + col_similarity * 0.3 + response_similarity * 0.2)
+
+@njit(cache=True, nogil=True)
+def _severity_kernel(metadata_score, added_columns, removed_columns, similarity, row_count_delta, signal_score):
+    """Severity score from precomputed metadata/signal points and change counts"""
+    severity_score = metadata_score + signal_score
+    
+    # Schema changes
+    if removed_columns > 0:
+        severity_score += 2  # Medium for removed columns
+    if added_columns > 0:
+        severity_score += 1  # Low for added columns
+    
+    # Content changes
+    if similarity < 0.5:
+        severity_score += 3  # High for major content drift
+    elif similarity < 0.8:
+        severity_score += 2  # Medium for moderate drift
+    
+    if abs(row_count_delta) > 10000:
+        severity_score += 2  # Medium for large row count changes
+    
+    return severity_score
+
+@dataclass
+class SnapshotBatch:
+    """Snapshot pairs for many datasets, with CONTENT_FIELDS stored column-wise"""
+    dataset_ids: List[str]
+    from_snapshots: List[Dict]
+    to_snapshots: List[Dict]
+    from_counts: Dict[str, np.ndarray]  # {"row_count": array([...]), ...}, NaN where NULL
+    to_counts: Dict[str, np.ndarray]
+    
+    @classmethod
+    def from_pairs(cls, pairs: Dict[str, Tuple[Dict, Dict]]) -> 'SnapshotBatch':
+        """Build a batch from {dataset_id: (from_snapshot, to_snapshot)}"""
+        from_snapshots = [from_snapshot for from_snapshot, _ in pairs.values()]
+        to_snapshots = [to_snapshot for _, to_snapshot in pairs.values()]
+        return cls(
+            dataset_ids=list(pairs),
+            from_snapshots=from_snapshots,
+            to_snapshots=to_snapshots,
+            from_counts=_count_columns(from_snapshots),
+            to_counts=_count_columns(to_snapshots)
+        )
+    
+    def __len__(self) -> int:
+        return len(self.dataset_ids)
+
+def _count_columns(snapshots: List[Dict]) -> Dict[str, np.ndarray]:
+    """One contiguous float64 array per content field (float so NULL can be NaN)"""
+    return {
+        field: np.array([snapshot.get(field, 0) for snapshot in snapshots], dtype=np.float64)
+        for field in CONTENT_FIELDS
+    }
+
+def _bulk_content_similarity(batch: SnapshotBatch) -> np.ndarray:
+    """Vectorized _calculate_content_similarity over a batch; NaN where a field is NULL"""
+    similarities = {}
+    for field in CONTENT_FIELDS:
+        from_counts = batch.from_counts[field]
+        to_counts = batch.to_counts[field]
+        largest = np.maximum(from_counts, to_counts)
+        
+        # Same as _ratio_similarity: divide by 1 where neither side is positive, then mask to 1.0
+        positive = largest > 0
+        similarities[field] = np.where(positive, np.minimum(from_counts, to_counts) / np.where(positive, largest, 1.0), 1.0)
+    
+    weighted = (similarities['row_count'] * 0.5 + similarities['column_count'] * 0.3 +
+                similarities['response_time_ms'] * 0.2)
+    
+    from_rows = batch.from_counts['row_count']
+    to_rows = batch.to_counts['row_count']
+    weighted = np.where((from_rows == 0) | (to_rows == 0), 0.0, weighted)
+    weighted = np.where((from_rows == 0) & (to_rows == 0), 1.0, weighted)
+    
+    # NULL fields go through the scalar path so they behave exactly like compute_diff
+    missing = np.zeros(len(batch), dtype=bool)
+    for field in CONTENT_FIELDS:
+        missing |= np.isnan(batch.from_counts[field]) | np.isnan(batch.to_counts[field])
+    return np.where(missing, np.nan, weighted)
+
 class EnhancedDiffEngineV2:
     """Enhanced diff engine with comprehensive change detection"""
     
     def __init__(self, db_path: str = "datasets.db"):
         self.db_path = db_path
+        self._conn = self._connect()
+        # Serializes write transactions on the shared connection
+        self._write_lock = threading.Lock()
         self._init_database()
+        
+        if NUMBA_AVAILABLE:
+            # Compile (or load from cache) the kernels before the first diff
+            _similarity_kernel(1, 1, 1, 1, 1, 1)
+            _severity_kernel(0, 0, 0, 1.0, 0, 0)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a tuned connection to the engine's database"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None,
+                               check_same_thread=False, cached_statements=256)
+        conn.executescript(CONNECTION_PRAGMAS)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def close(self):
+        """Close the engine's database connection"""
+        self._conn.close()
     
     def _init_database(self):
         """Initialize database tables for diff storage"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
         
         # Create diffs table
         cursor.execute('''
@@ -98,41 +354,48 @@ class EnhancedDiffEngineV2:
             )
         ''')
         
-        conn.commit()
-        conn.close()
+        # (dataset_id, from_date, to_date) lookups use the UNIQUE constraint's index
+        indexes = {
+            'ix_diffs_ds_to': 'CREATE INDEX IF NOT EXISTS ix_diffs_ds_to ON dataset_diffs(dataset_id, to_date DESC)',
+            'ix_field_changes_diff': 'CREATE INDEX IF NOT EXISTS ix_field_changes_diff ON field_changes(diff_id)',
+            'ix_states_ds_date': '''
+                CREATE INDEX IF NOT EXISTS ix_states_ds_date
+                ON dataset_states(dataset_id, DATE(created_at), created_at DESC)
+            '''
+        }
+        
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        existing_indexes = {row[0] for row in cursor.fetchall()}
+        
+        for name, index_sql in indexes.items():
+            if name in existing_indexes:
+                continue
+            try:
+                cursor.execute(index_sql)
+                # Give the planner statistics for the new index
+                cursor.execute(f'ANALYZE {name}')
+            except sqlite3.OperationalError:
+                # dataset_states is created by the collectors; retried on a later run
+                pass
     
-    def get_dataset_snapshots(self, dataset_id: str, from_date: str, to_date: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+    def get_dataset_snapshots(self, dataset_id: str, from_date: str, to_date: str,
+                              conn: Optional[sqlite3.Connection] = None) -> Tuple[Optional[Dict], Optional[Dict]]:
         """Get two snapshots for comparison"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = (conn or self._conn).cursor()
+        
+        # Both dates in one round trip; newest row per date comes first
+        cursor.execute(_SQL_FETCH_SNAPSHOTS, (dataset_id, from_date, to_date))
+        
+        by_date = {}
+        for row in cursor:
+            if row['snapshot_day'] not in by_date:
+                snapshot = dict(row)
+                del snapshot['snapshot_day']
+                by_date[row['snapshot_day']] = snapshot
+        
+        from_snapshot = by_date.get(from_date)
+        to_snapshot = by_date.get(to_date)
         
-        # Get from snapshot
-        cursor.execute('''
-            SELECT * FROM dataset_states
-            WHERE dataset_id = ? AND DATE(created_at) = ?
-            ORDER BY created_at DESC LIMIT 1
-        ''', (dataset_id, from_date))
-        
-        from_row = cursor.fetchone()
-        from_snapshot = None
-        if from_row:
-            columns = [description[0] for description in cursor.description]
-            from_snapshot = dict(zip(columns, from_row))
-        
-        # Get to snapshot
-        cursor.execute('''
-            SELECT * FROM dataset_states
-            WHERE dataset_id = ? AND DATE(created_at) = ?
-            ORDER BY created_at DESC LIMIT 1
-        ''', (dataset_id, to_date))
-        
-        to_row = cursor.fetchone()
-        to_snapshot = None
-        if to_row:
-            columns = [description[0] for description in cursor.description]
-            to_snapshot = dict(zip(columns, to_row))
-        
-        conn.close()
         return from_snapshot, to_snapshot
     
     def compute_diff(self, dataset_id: str, from_date: str, to_date: str) -> Optional[DiffResult]:
@@ -142,20 +405,121 @@ class EnhancedDiffEngineV2:
         if not from_snapshot or not to_snapshot:
             return None
         
-        # Compute metadata changes
-        metadata_changes = self._compute_metadata_changes(from_snapshot, to_snapshot)
+        return self._assemble_diff(dataset_id, from_date, to_date, from_snapshot, to_snapshot)
+    
+    def compute_diffs_parallel(self, pairs: List[Tuple[str, str, str]], max_workers: Optional[int] = None,
+                               store: bool = False) -> List[Optional[DiffResult]]:
+        """Compute diffs for many (dataset_id, from_date, to_date) triples on a thread pool,
+        optionally storing all of them in a single transaction"""
+        pairs = list(pairs)
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = max(1, min(max_workers, len(pairs)))
+        
+        if max_workers > 1:
+            # sqlite3 releases the GIL while stepping, so snapshot reads overlap;
+            # each worker thread reads through its own connection
+            local = threading.local()
+            connections = []
+            
+            def compute(pair):
+                conn = getattr(local, 'conn', None)
+                if conn is None:
+                    conn = local.conn = self._connect()
+                    connections.append(conn)
+                
+                dataset_id, from_date, to_date = pair
+                from_snapshot, to_snapshot = self.get_dataset_snapshots(dataset_id, from_date, to_date, conn)
+                if not from_snapshot or not to_snapshot:
+                    return None
+                return self._assemble_diff(dataset_id, from_date, to_date, from_snapshot, to_snapshot)
+            
+            try:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    results = list(executor.map(compute, pairs))
+            finally:
+                for conn in connections:
+                    conn.close()
+        else:
+            results = [self.compute_diff(*pair) for pair in pairs]
         
-        # Compute schema changes
-        schema_changes = self._compute_schema_changes(from_snapshot, to_snapshot)
+        if store:
+            self.store_diffs([result for result in results if result is not None])
         
-        # Compute content changes
-        content_changes = self._compute_content_changes(from_snapshot, to_snapshot)
+        return results
+    
+    def compute_diffs_bulk(self, dataset_ids: List[str], from_date: str, to_date: str) -> List[DiffResult]:
+        """Compute diffs for many datasets between the same two dates"""
+        batch = self._load_snapshot_batch(dataset_ids, from_date, to_date)
+        if not len(batch):
+            return []
+        
+        similarities = _bulk_content_similarity(batch).tolist()
+        
+        # Objects are only materialized here, from the batch's columns
+        return [
+            self._assemble_diff(batch.dataset_ids[i], from_date, to_date,
+                                batch.from_snapshots[i], batch.to_snapshots[i],
+                                None if np.isnan(similarities[i]) else similarities[i])
+            for i in range(len(batch))
+        ]
+    
+    def _load_snapshot_batch(self, dataset_ids: List[str], from_date: str, to_date: str) -> SnapshotBatch:
+        """Load the latest from/to snapshots for many datasets, keeping only complete pairs"""
+        cursor = self._conn.cursor()
+        by_key = {}
+        
+        batch_size = SQLITE_MAX_VARIABLES - 2
+        for start in range(0, len(dataset_ids), batch_size):
+            batch = dataset_ids[start:start + batch_size]
+            cursor.execute(f'''
+                SELECT DATE(created_at) AS snapshot_day, * FROM dataset_states
+                WHERE dataset_id IN ({', '.join('?' * len(batch))}) AND DATE(created_at) IN (?, ?)
+                ORDER BY created_at DESC
+            ''', (*batch, from_date, to_date))
+            
+            for row in cursor:
+                key = (row['dataset_id'], row['snapshot_day'])
+                if key not in by_key:
+                    snapshot = dict(row)
+                    del snapshot['snapshot_day']
+                    by_key[key] = snapshot
+        
+        pairs = {}
+        for dataset_id in dataset_ids:
+            from_snapshot = by_key.get((dataset_id, from_date))
+            to_snapshot = by_key.get((dataset_id, to_date))
+            if from_snapshot and to_snapshot:
+                pairs[dataset_id] = (from_snapshot, to_snapshot)
+        
+        return SnapshotBatch.from_pairs(pairs)
+    
+    def compute_and_store_diff(self, dataset_id: str, from_date: str, to_date: str, *,
+                               return_result: bool = False) -> Optional[Union[int, DiffResult]]:
+        """Compute and persist a diff; returns its id, or the DiffResult if return_result is set"""
+        from_snapshot, to_snapshot = self.get_dataset_snapshots(dataset_id, from_date, to_date)
         
-        # Generate signals
-        signals = self._generate_signals(metadata_changes, schema_changes, content_changes)
+        if not from_snapshot or not to_snapshot:
+            return None
         
-        # Calculate severity
-        severity = self._calculate_severity(metadata_changes, schema_changes, content_changes, signals)
+        # The parts go straight to storage; a DiffResult is only built on request
+        parts = self._compute_diff_parts(from_snapshot, to_snapshot)
+        created_at = datetime.now()
+        
+        with self._write_lock:
+            diff_id = self._store_diff_locked(dataset_id, from_date, to_date, *parts, created_at)
+        
+        if return_result:
+            return DiffResult(dataset_id, from_date, to_date, *parts, created_at)
+        return diff_id
+    
+    def _assemble_diff(self, dataset_id: str, from_date: str, to_date: str,
+                       from_snapshot: Dict, to_snapshot: Dict,
+                       similarity: Optional[float] = None) -> DiffResult:
+        """Build a DiffResult from two loaded snapshots"""
+        metadata_changes, schema_changes, content_changes, signals, severity = self._compute_diff_parts(
+            from_snapshot, to_snapshot, similarity
+        )
         
         return DiffResult(
             dataset_id=dataset_id,
@@ -169,24 +533,51 @@ class EnhancedDiffEngineV2:
             created_at=datetime.now()
         )
     
+    def _compute_diff_parts(self, from_snapshot: Dict, to_snapshot: Dict,
+                            similarity: Optional[float] = None
+                            ) -> Tuple[List[FieldChange], SchemaChange, ContentChange, Dict[str, bool], str]:
+        """Compute every component of a diff, in DiffResult field order"""
+        # Unchanged snapshots (the common case for frequent polling) skip the comparisons
+        if (_content_values(from_snapshot) == _content_values(to_snapshot) and
+                _metadata_values(from_snapshot) == _metadata_values(to_snapshot)):
+            return self._unchanged_diff_parts()
+        
+        # Compute metadata changes
+        metadata_changes = self._compute_metadata_changes(from_snapshot, to_snapshot)
+        
+        # Compute schema changes
+        schema_changes = self._compute_schema_changes(from_snapshot, to_snapshot)
+        
+        # Compute content changes
+        content_changes = self._compute_content_changes(from_snapshot, to_snapshot, similarity)
+        
+        # Generate signals
+        signals = self._generate_signals(metadata_changes, schema_changes, content_changes)
+        
+        # Calculate severity
+        severity = self._calculate_severity(metadata_changes, schema_changes, content_changes, signals)
+        
+        return metadata_changes, schema_changes, content_changes, signals, severity
+    
+    def _unchanged_diff_parts(self) -> Tuple[List[FieldChange], SchemaChange, ContentChange, Dict[str, bool], str]:
+        """Diff components for two snapshots with identical tracked fields"""
+        return (
+            [],
+            SchemaChange(added_columns=[], removed_columns=[], renamed_columns=[], dtype_changes=[], row_delta=0),
+            ContentChange(dataset_similarity=1.0, columns_changed=[], quantile_shifts=[],
+                          row_count_delta=0, content_hash_changed=False),
+            dict.fromkeys(SIGNAL_NAMES, False),
+            SEVERITY_LEVELS[-1][1]
+        )
+    
     def _compute_metadata_changes(self, from_snapshot: Dict, to_snapshot: Dict) -> List[FieldChange]:
         """Compute metadata field changes"""
         changes = []
         
-        # Define metadata fields to track
-        metadata_fields = {
-            'title': 'string',
-            'agency': 'string', 
-            'url': 'string',
-            'availability': 'string',
-            'last_modified': 'datetime',
-            'dimension_computation_time_ms': 'number'
-        }
+        old_values = _metadata_values(from_snapshot)
+        new_values = _metadata_values(to_snapshot)
         
-        for field, field_type in metadata_fields.items():
-            old_value = from_snapshot.get(field)
-            new_value = to_snapshot.get(field)
-            
+        for field, old_value, new_value in zip(METADATA_FIELDS, old_values, new_values):
             if old_value != new_value:
                 change_type = "modified"
                 if old_value is None:
@@ -232,13 +623,15 @@ class EnhancedDiffEngineV2:
             row_delta=row_delta
         )
     
-    def _compute_content_changes(self, from_snapshot: Dict, to_snapshot: Dict) -> ContentChange:
+    def _compute_content_changes(self, from_snapshot: Dict, to_snapshot: Dict,
+                                 similarity: Optional[float] = None) -> ContentChange:
         """Compute content changes between snapshots"""
         from_rows = from_snapshot.get('row_count', 0)
         to_rows = to_snapshot.get('row_count', 0)
         
         # Calculate similarity based on row count and response time
-        similarity = self._calculate_content_similarity(from_snapshot, to_snapshot)
+        if similarity is None:
+            similarity = self._calculate_content_similarity(from_snapshot, to_snapshot)
         
         # Determine which "columns" changed (simplified)
         columns_changed = []
@@ -255,10 +648,8 @@ class EnhancedDiffEngineV2:
                     "p95_delta": percent_change
                 })
         
-        # Check if content hash changed (simplified)
-        from_hash = self._compute_content_hash(from_snapshot)
-        to_hash = self._compute_content_hash(to_snapshot)
-        content_hash_changed = from_hash != to_hash
+        # Content is considered changed when any of its key fields differ
+        content_hash_changed = _content_values(from_snapshot) != _content_values(to_snapshot)
         
         return ContentChange(
             dataset_similarity=similarity,
@@ -272,50 +663,17 @@ class EnhancedDiffEngineV2:
         """Calculate content similarity between snapshots"""
         # Simplified similarity calculation
         # In a full implementation, this would use minhash or other techniques
-        
-        from_rows = from_snapshot.get('row_count', 0)
-        to_rows = to_snapshot.get('row_count', 0)
-        from_cols = from_snapshot.get('column_count', 0)
-        to_cols = to_snapshot.get('column_count', 0)
-        
-        if from_rows == 0 and to_rows == 0:
-            return 1.0
-        
-        if from_rows == 0 or to_rows == 0:
-            return 0.0
-        
-        # Row count similarity
-        row_similarity = 1.0 - abs(from_rows - to_rows) / max(from_rows, to_rows)
-        
-        # Column count similarity
-        col_similarity = 1.0 - abs(from_cols - to_cols) / max(from_cols, to_cols) if max(from_cols, to_cols) > 0 else 1.0
-        
-        # Response time similarity
-        from_response = from_snapshot.get('response_time_ms', 0)
-        to_response = to_snapshot.get('response_time_ms', 0)
-        response_similarity = 1.0 - abs(from_response - to_response) / max(from_response, to_response) if max(from_response, to_response) > 0 else 1.0
-        
-        # Weighted average
-        return (row_similarity * 0.5 + col_similarity * 0.3 + response_similarity * 0.2)
-    
-    def _compute_content_hash(self, snapshot: Dict) -> str:
-        """Compute content hash for a snapshot"""
-        # Simplified content hash based on key fields
-        content_string = f"{snapshot.get('row_count', 0)}_{snapshot.get('column_count', 0)}_{snapshot.get('response_time_ms', 0)}"
-        return hashlib.md5(content_string.encode()).hexdigest()
+        return _similarity_kernel(
+            from_snapshot.get('row_count', 0), to_snapshot.get('row_count', 0),
+            from_snapshot.get('column_count', 0), to_snapshot.get('column_count', 0),
+            from_snapshot.get('response_time_ms', 0), to_snapshot.get('response_time_ms', 0)
+        )
     
     def _generate_signals(self, metadata_changes: List[FieldChange], 
                          schema_changes: SchemaChange, 
                          content_changes: ContentChange) -> Dict[str, bool]:
         """Generate signals based on changes"""
-        signals = {
-            "major_change": False,
-            "license_flip": False,
-            "url_moved": False,
-            "schema_shrink": False,
-            "content_drift": False,
-            "row_count_spike": False
-        }
+        signals = dict.fromkeys(SIGNAL_NAMES, False)
         
         # Check for major changes
         if len(metadata_changes) > 2 or len(schema_changes.added_columns) > 0 or len(schema_changes.removed_columns) > 0:
@@ -350,128 +708,135 @@ class EnhancedDiffEngineV2:
                            content_changes: ContentChange, 
                            signals: Dict[str, bool]) -> str:
         """Calculate overall severity of changes"""
-        severity_score = 0
+        metadata_score = sum(METADATA_SEVERITY_WEIGHTS.get((change.field, change.change_type), 1)
+                             for change in metadata_changes)
+        signal_score = sum(weight for name, weight in SIGNAL_SEVERITY_WEIGHTS.items() if signals.get(name))
+        
+        severity_score = _severity_kernel(
+            metadata_score,
+            len(schema_changes.added_columns),
+            len(schema_changes.removed_columns),
+            content_changes.dataset_similarity,
+            content_changes.row_count_delta,
+            signal_score
+        )
         
-        # Metadata changes
-        for change in metadata_changes:
-            if change.field == "availability" and change.change_type == "modified":
-                severity_score += 3  # High severity for availability changes
-            elif change.field == "url" and change.change_type == "modified":
-                severity_score += 2  # Medium-high for URL changes
-            else:
-                severity_score += 1  # Low for other metadata changes
-        
-        # Schema changes
-        if len(schema_changes.removed_columns) > 0:
-            severity_score += 2  # Medium for removed columns
-        if len(schema_changes.added_columns) > 0:
-            severity_score += 1  # Low for added columns
-        
-        # Content changes
-        if content_changes.dataset_similarity < 0.5:
-            severity_score += 3  # High for major content drift
-        elif content_changes.dataset_similarity < 0.8:
-            severity_score += 2  # Medium for moderate drift
-        
-        if abs(content_changes.row_count_delta) > 10000:
-            severity_score += 2  # Medium for large row count changes
-        
-        # Signal-based severity
-        if signals.get("license_flip"):
-            severity_score += 2
-        if signals.get("url_moved"):
-            severity_score += 1
-        if signals.get("schema_shrink"):
-            severity_score += 2
-        if signals.get("content_drift"):
-            severity_score += 2
-        
-        if severity_score >= 5:
-            return "high"
-        elif severity_score >= 3:
-            return "medium"
-        else:
-            return "low"
+        for threshold, level in SEVERITY_LEVELS:
+            if severity_score >= threshold:
+                return level
+        return "low"
     
     def store_diff(self, diff_result: DiffResult) -> int:
         """Store diff result in database"""
-        conn = sqlite3.connect(self.db_path)
+        with self._write_lock:
+            return self._store_diff_locked(
+                diff_result.dataset_id,
+                diff_result.from_date,
+                diff_result.to_date,
+                diff_result.metadata_changes,
+                diff_result.schema_changes,
+                diff_result.content_changes,
+                diff_result.signals,
+                diff_result.severity,
+                diff_result.created_at
+            )
+    
+    def _store_diff_locked(self, dataset_id: str, from_date: str, to_date: str,
+                           metadata_changes: List[FieldChange], schema_changes: SchemaChange,
+                           content_changes: ContentChange, signals: Dict[str, bool],
+                           severity: str, created_at: datetime) -> int:
+        """Write one diff and its field changes in a single transaction"""
+        conn = self._conn
         cursor = conn.cursor()
         
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            diff_id = self._write_diff(cursor, dataset_id, from_date, to_date, metadata_changes,
+                                       schema_changes, content_changes, signals, severity, created_at)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        return diff_id
+    
+    def store_diffs(self, diff_results: List[DiffResult]) -> List[int]:
+        """Store many diff results in a single transaction"""
+        with self._write_lock:
+            conn = self._conn
+            cursor = conn.cursor()
+            
+            try:
+                cursor.execute('BEGIN IMMEDIATE')
+                diff_ids = [
+                    self._write_diff(cursor, diff_result.dataset_id, diff_result.from_date,
+                                     diff_result.to_date, diff_result.metadata_changes,
+                                     diff_result.schema_changes, diff_result.content_changes,
+                                     diff_result.signals, diff_result.severity, diff_result.created_at)
+                    for diff_result in diff_results
+                ]
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        return diff_ids
+    
+    def _write_diff(self, cursor: sqlite3.Cursor, dataset_id: str, from_date: str, to_date: str,
+                    metadata_changes: List[FieldChange], schema_changes: SchemaChange,
+                    content_changes: ContentChange, signals: Dict[str, bool],
+                    severity: str, created_at: datetime) -> int:
+        """Write one diff and its field changes inside the caller's transaction"""
+        # A recomputed diff is updated in place and its field changes replaced
+        cursor.execute(_SQL_GET_DIFF_ID, (dataset_id, from_date, to_date))
+        existing = cursor.fetchone()
+        
         # Store main diff record
-        cursor.execute('''
-            INSERT OR REPLACE INTO dataset_diffs
-            (dataset_id, from_date, to_date, metadata_changes, schema_changes,
-             content_changes, signals, severity, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            diff_result.dataset_id,
-            diff_result.from_date,
-            diff_result.to_date,
-            json.dumps([{
-                "field": change.field,
-                "old_value": change.old_value,
-                "new_value": change.new_value,
-                "change_type": change.change_type,
-                "confidence": change.confidence
-            } for change in diff_result.metadata_changes]),
-            json.dumps({
-                "added_columns": diff_result.schema_changes.added_columns,
-                "removed_columns": diff_result.schema_changes.removed_columns,
-                "renamed_columns": diff_result.schema_changes.renamed_columns,
-                "dtype_changes": diff_result.schema_changes.dtype_changes,
-                "row_delta": diff_result.schema_changes.row_delta
-            }),
-            json.dumps({
-                "dataset_similarity": diff_result.content_changes.dataset_similarity,
-                "columns_changed": diff_result.content_changes.columns_changed,
-                "quantile_shifts": diff_result.content_changes.quantile_shifts,
-                "row_count_delta": diff_result.content_changes.row_count_delta,
-                "content_hash_changed": diff_result.content_changes.content_hash_changed
-            }),
-            json.dumps(diff_result.signals),
-            diff_result.severity,
-            diff_result.created_at.isoformat()
+        cursor.execute(_SQL_UPSERT_DIFF, (
+            dataset_id,
+            from_date,
+            to_date,
+            _dumps(metadata_changes),
+            _dumps(schema_changes),
+            _dumps(content_changes),
+            _dumps(signals),
+            severity,
+            created_at.isoformat()
         ))
         
-        diff_id = cursor.lastrowid
+        if existing is None:
+            diff_id = cursor.lastrowid
+        else:
+            # lastrowid is not set when the upsert takes the update path
+            diff_id = existing[0]
+            cursor.execute(_SQL_DELETE_FIELD_CHANGES, (diff_id,))
         
         # Store individual field changes
-        for change in diff_result.metadata_changes:
-            cursor.execute('''
-                INSERT INTO field_changes
-                (diff_id, field_name, old_value, new_value, change_type, confidence)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
+        cursor.executemany(_SQL_INSERT_FIELD_CHANGE, [
+            (
                 diff_id,
                 change.field,
                 str(change.old_value) if change.old_value is not None else None,
                 str(change.new_value) if change.new_value is not None else None,
                 change.change_type,
                 change.confidence
-            ))
+            )
+            for change in metadata_changes
+        ])
         
-        conn.commit()
-        conn.close()
         return diff_id
     
     def get_diff(self, dataset_id: str, from_date: str, to_date: str) -> Optional[Dict]:
         """Get stored diff for a dataset between two dates"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
         
-        cursor.execute('''
-            SELECT * FROM dataset_diffs
-            WHERE dataset_id = ? AND from_date = ? AND to_date = ?
-        ''', (dataset_id, from_date, to_date))
+        cursor.execute(_SQL_GET_DIFF, (dataset_id, from_date, to_date))
         
         row = cursor.fetchone()
         if not row:
-            conn.close()
             return None
         
-        columns = [description[0] for description in cursor.description]
-        diff_data = dict(zip(columns, row))
+        diff_data = dict(row)
         
         # Parse JSON fields
         diff_data['metadata_changes'] = json.loads(diff_data['metadata_changes'] or '[]')
@@ -479,26 +844,18 @@ class EnhancedDiffEngineV2:
         diff_data['content_changes'] = json.loads(diff_data['content_changes'] or '{}')
         diff_data['signals'] = json.loads(diff_data['signals'] or '{}')
         
-        conn.close()
         return diff_data
     
     def get_dataset_diffs(self, dataset_id: str, limit: int = 10) -> List[Dict]:
         """Get all diffs for a dataset"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
         
-        cursor.execute('''
-            SELECT * FROM dataset_diffs
-            WHERE dataset_id = ?
-            ORDER BY to_date DESC
-            LIMIT ?
-        ''', (dataset_id, limit))
+        cursor.execute(_SQL_LIST_DIFFS, (dataset_id, limit))
         
-        columns = [description[0] for description in cursor.description]
         diffs = []
         
         for row in cursor.fetchall():
-            diff_data = dict(zip(columns, row))
+            diff_data = dict(row)
             # Parse JSON fields
             diff_data['metadata_changes'] = json.loads(diff_data['metadata_changes'] or '[]')
             diff_data['schema_changes'] = json.loads(diff_data['schema_changes'] or '{}')
@@ -506,22 +863,59 @@ class EnhancedDiffEngineV2:
             diff_data['signals'] = json.loads(diff_data['signals'] or '{}')
             diffs.append(diff_data)
         
-        conn.close()
         return diffs
 
 def main():
     """Test the enhanced diff engine"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Enhanced Diff Engine V2')
+    parser.add_argument('--from-date', help='Diff every dataset from this date (with --to-date)')
+    parser.add_argument('--to-date', help='Diff every dataset to this date (with --from-date)')
+    parser.add_argument('--backfill', action='store_true',
+                        help='Diff every consecutive snapshot date pair of every dataset')
+    parser.add_argument('--workers', type=int, help='Worker threads for --backfill')
+    args = parser.parse_args()
+    
     engine = EnhancedDiffEngineV2()
     
+    if args.from_date and args.to_date:
+        # Every dataset snapshotted on both dates, loaded and scored as one batch
+        cursor = engine._conn.execute('''
+            SELECT DISTINCT dataset_id FROM dataset_states
+            WHERE DATE(created_at) = ?
+        ''', (args.to_date,))
+        dataset_ids = [row[0] for row in cursor.fetchall()]
+        
+        diff_results = engine.compute_diffs_bulk(dataset_ids, args.from_date, args.to_date)
+        engine.store_diffs(diff_results)
+        print(f"Stored {len(diff_results)} diffs from {args.from_date} to {args.to_date}")
+        return
+    
+    if args.backfill:
+        cursor = engine._conn.execute('''
+            SELECT DISTINCT dataset_id, DATE(created_at) AS snapshot_date
+            FROM dataset_states
+            ORDER BY dataset_id, snapshot_date
+        ''')
+        pairs = []
+        for dataset_id, rows in groupby(cursor.fetchall(), key=itemgetter(0)):
+            dates = [row[1] for row in rows]
+            pairs.extend((dataset_id, from_date, to_date)
+                         for from_date, to_date in zip(dates, dates[1:]))
+        
+        # Snapshot reads fan out over worker threads; the diffs are stored in one transaction
+        diff_results = engine.compute_diffs_parallel(pairs, max_workers=args.workers, store=True)
+        stored = sum(1 for diff_result in diff_results if diff_result is not None)
+        print(f"Backfilled {stored} diffs over {len(pairs)} snapshot pairs")
+        return
+    
     # Get some sample dataset IDs
-    conn = sqlite3.connect("datasets.db")
-    cursor = conn.cursor()
-    cursor.execute('''
+    cursor = engine._conn.execute('''
         SELECT DISTINCT dataset_id FROM dataset_states 
         ORDER BY created_at DESC LIMIT 5
     ''')
     dataset_ids = [row[0] for row in cursor.fetchall()]
-    conn.close()
     
     if not dataset_ids:
         print("No datasets found in database")
@@ -532,16 +926,13 @@ def main():
     print(f"Testing diff computation for dataset: {dataset_id}")
     
     # Get available dates for this dataset
-    conn = sqlite3.connect("datasets.db")
-    cursor = conn.cursor()
-    cursor.execute('''
+    cursor = engine._conn.execute('''
         SELECT DISTINCT DATE(created_at) as snapshot_date
         FROM dataset_states
         WHERE dataset_id = ?
         ORDER BY snapshot_date ASC
     ''', (dataset_id,))
     dates = [row[0] for row in cursor.fetchall()]
-    conn.close()
     
     if len(dates) < 2:
         print(f"Need at least 2 snapshots for {dataset_id}")
@@ -13,58 +13,150 @@ import sqlite3
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional, Set
+from typing import Dict, List, Tuple, Optional, Set, Union
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum
+from operator import attrgetter, itemgetter
 import hashlib
+import heapq
+import os
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, groupby, islice
 
 logger = logging.getLogger(__name__)
 
-class EventType(Enum):
-    """Normalized event types"""
+# Event extraction is read-heavy and scans long ordered ranges, so favor a
+# large page cache and memory-mapped reads
+CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA cache_size=-262144;
+    PRAGMA mmap_size=1073741824;
+    PRAGMA temp_store=MEMORY;
+"""
+
+# SQLite's default limit on bound parameters per statement
+SQLITE_MAX_VARIABLES = 999
+
+# Per-dataset event lists kept in memory when caching is enabled
+EVENT_CACHE_SIZE = 4096
+
+# Snapshot columns in the positional order the pair diffing reads them
+SNAPSHOT_COLUMNS = '''
+    snapshot_date, title, agency, url, status_code, content_type,
+    resource_format, schema, last_modified, availability, row_count,
+    column_count, file_size, content_hash
+'''
+
+class EventType(IntEnum):
+    """Normalized event types; integer-valued so they hash and compare as ints"""
     # Metadata changes
-    TITLE_CHANGED = "TITLE_CHANGED"
-    AGENCY_CHANGED = "AGENCY_CHANGED"
-    URL_CHANGED = "URL_CHANGED"
-    DESCRIPTION_CHANGED = "DESCRIPTION_CHANGED"
-    LICENSE_CHANGED = "LICENSE_CHANGED"
-    PUBLISHER_CHANGED = "PUBLISHER_CHANGED"
+    TITLE_CHANGED = 1
+    AGENCY_CHANGED = 2
+    URL_CHANGED = 3
+    DESCRIPTION_CHANGED = 4
+    LICENSE_CHANGED = 5
+    PUBLISHER_CHANGED = 6
     
     # Schema changes
-    SCHEMA_SHRINK = "SCHEMA_SHRINK"
-    SCHEMA_EXPAND = "SCHEMA_EXPAND"
-    COLUMN_ADDED = "COLUMN_ADDED"
-    COLUMN_REMOVED = "COLUMN_REMOVED"
-    COLUMN_RENAMED = "COLUMN_RENAMED"
-    DATA_TYPE_CHANGED = "DATA_TYPE_CHANGED"
+    SCHEMA_SHRINK = 7
+    SCHEMA_EXPAND = 8
+    COLUMN_ADDED = 9
+    COLUMN_REMOVED = 10
+    COLUMN_RENAMED = 11
+    DATA_TYPE_CHANGED = 12
     
     # Content changes
-    ROW_COUNT_INCREASED = "ROW_COUNT_INCREASED"
-    ROW_COUNT_DECREASED = "ROW_COUNT_DECREASED"
-    CONTENT_DRIFT = "CONTENT_DRIFT"
-    FILE_SIZE_CHANGED = "FILE_SIZE_CHANGED"
+    ROW_COUNT_INCREASED = 13
+    ROW_COUNT_DECREASED = 14
+    CONTENT_DRIFT = 15
+    FILE_SIZE_CHANGED = 16
     
     # Availability changes
-    BECAME_AVAILABLE = "BECAME_AVAILABLE"
-    BECAME_UNAVAILABLE = "BECAME_UNAVAILABLE"
-    STATUS_CODE_CHANGED = "STATUS_CODE_CHANGED"
+    BECAME_AVAILABLE = 17
+    BECAME_UNAVAILABLE = 18
+    STATUS_CODE_CHANGED = 19
     
     # Structural changes
-    FORMAT_CHANGED = "FORMAT_CHANGED"
-    STRUCTURE_CHANGED = "STRUCTURE_CHANGED"
+    FORMAT_CHANGED = 20
+    STRUCTURE_CHANGED = 21
     
     # Temporal changes
-    LAST_MODIFIED_CHANGED = "LAST_MODIFIED_CHANGED"
-    SNAPSHOT_CREATED = "SNAPSHOT_CREATED"
+    LAST_MODIFIED_CHANGED = 22
+    SNAPSHOT_CREATED = 23
 
-class EventSeverity(Enum):
+# Serialized name of each event type, used wherever events leave the module
+EVENT_TYPE_NAMES: Dict[EventType, str] = {event_type: event_type.name for event_type in EventType}
+
+# Category of each event type, looked up per event instead of prefix-matching the name
+_CATEGORY_BY_EVENT: Dict[EventType, str] = {
+    EventType.TITLE_CHANGED: 'metadata',
+    EventType.AGENCY_CHANGED: 'metadata',
+    EventType.URL_CHANGED: 'metadata',
+    EventType.DESCRIPTION_CHANGED: 'metadata',
+    EventType.LICENSE_CHANGED: 'metadata',
+    EventType.PUBLISHER_CHANGED: 'metadata',
+    EventType.SCHEMA_SHRINK: 'schema',
+    EventType.SCHEMA_EXPAND: 'schema',
+    EventType.COLUMN_ADDED: 'schema',
+    EventType.COLUMN_REMOVED: 'schema',
+    EventType.COLUMN_RENAMED: 'schema',
+    EventType.DATA_TYPE_CHANGED: 'schema',
+    EventType.STRUCTURE_CHANGED: 'schema',
+    EventType.ROW_COUNT_INCREASED: 'content',
+    EventType.ROW_COUNT_DECREASED: 'content',
+    EventType.CONTENT_DRIFT: 'content',
+    EventType.FILE_SIZE_CHANGED: 'content',
+    EventType.BECAME_AVAILABLE: 'availability',
+    EventType.BECAME_UNAVAILABLE: 'availability',
+    EventType.STATUS_CODE_CHANGED: 'availability',
+    EventType.FORMAT_CHANGED: 'temporal',
+    EventType.LAST_MODIFIED_CHANGED: 'temporal',
+    EventType.SNAPSHOT_CREATED: 'temporal',
+}
+
+class EventSeverity(IntEnum):
     """Event severity levels"""
-    LOW = "LOW"
-    MEDIUM = "MEDIUM"
-    HIGH = "HIGH"
-    CRITICAL = "CRITICAL"
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+    CRITICAL = 4
+
+SEVERITY_NAMES: Dict[EventSeverity, str] = {severity: severity.name for severity in EventSeverity}
+
+# Per-pair SQL conditions mirroring _extract_events_from_snapshot_pair; schema
+# structure changes need JSON comparison and are resolved in Python
+_EVENT_COUNT_CONDITIONS = (
+    (EventType.TITLE_CHANGED, EventSeverity.MEDIUM, 'curr.title IS NOT prev.title'),
+    (EventType.AGENCY_CHANGED, EventSeverity.HIGH, 'curr.agency IS NOT prev.agency'),
+    (EventType.URL_CHANGED, EventSeverity.HIGH, 'curr.url IS NOT prev.url'),
+    (EventType.FORMAT_CHANGED, EventSeverity.MEDIUM, 'curr.content_type IS NOT prev.content_type'),
+    (EventType.ROW_COUNT_INCREASED, EventSeverity.MEDIUM, 'COALESCE(curr.row_count, 0) > COALESCE(prev.row_count, 0)'),
+    (EventType.ROW_COUNT_DECREASED, EventSeverity.HIGH, 'COALESCE(curr.row_count, 0) < COALESCE(prev.row_count, 0)'),
+    (EventType.SCHEMA_EXPAND, EventSeverity.MEDIUM, 'COALESCE(curr.column_count, 0) > COALESCE(prev.column_count, 0)'),
+    (EventType.SCHEMA_SHRINK, EventSeverity.HIGH, 'COALESCE(curr.column_count, 0) < COALESCE(prev.column_count, 0)'),
+    (EventType.FILE_SIZE_CHANGED, EventSeverity.MEDIUM, 'COALESCE(curr.file_size, 0) != COALESCE(prev.file_size, 0)'),
+    (EventType.CONTENT_DRIFT, EventSeverity.MEDIUM, 'curr.content_hash IS NOT prev.content_hash'),
+    (EventType.BECAME_AVAILABLE, EventSeverity.MEDIUM, "curr.availability IS NOT prev.availability AND curr.availability = 'available'"),
+    (EventType.BECAME_UNAVAILABLE, EventSeverity.HIGH, "curr.availability IS NOT prev.availability AND curr.availability = 'unavailable'"),
+    (EventType.STATUS_CODE_CHANGED, EventSeverity.MEDIUM, 'curr.status_code IS NOT prev.status_code'),
+    (EventType.LAST_MODIFIED_CHANGED, EventSeverity.LOW, 'curr.last_modified IS NOT prev.last_modified'),
+    (EventType.SNAPSHOT_CREATED, EventSeverity.LOW, '1'),
+)
+
+# Every snapshot joined to its predecessor. Only the row id goes through LAG();
+# each extra window function costs about as much as the whole join.
+_SQL_SNAPSHOT_PAIRS = '''
+    FROM (
+        SELECT id, LAG(id) OVER (PARTITION BY dataset_id ORDER BY snapshot_date) AS prev_id
+        FROM dataset_states
+    ) AS pair
+    JOIN dataset_states AS curr ON curr.id = pair.id
+    JOIN dataset_states AS prev ON prev.id = pair.prev_id
+'''
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DatasetEvent:
     """Represents a normalized dataset event"""
     event_id: str
@@ -73,61 +165,207 @@ class DatasetEvent:
     severity: EventSeverity
     timestamp: str
     description: str
-    old_value: Optional[str]
-    new_value: Optional[str]
+    old_value: Optional[Union[str, int]]  # counts stay ints until serialized
+    new_value: Optional[Union[str, int]]
     impact_score: float
     metadata: Dict
 
 class EnhancedEventExtractor:
     """Enhanced event extraction and analysis system"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, cache_events: bool = False):
         self.db_path = db_path
-        
-    def extract_events_for_dataset(self, dataset_id: str) -> List[DatasetEvent]:
-        """Extract all events for a specific dataset"""
+        # Stamped once per extraction run rather than per event
+        self._extracted_at = datetime.now().isoformat()
+        # Opt-in: a cached dataset only notices rows edited in place through invalidate()
+        self._cache_events = cache_events
+        self._event_cache = OrderedDict()
+        self._conn = self._connect()
+        self.init_database()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection tuned for read-heavy snapshot scans"""
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript(CONNECTION_PRAGMAS)
+        return conn
+    
+    def close(self):
+        """Close the extractor's database connection"""
+        self._conn.close()
+    
+    def init_database(self):
+        """Create the summary cache tables and the covering index the snapshot scans read from"""
+        try:
+            # Persisted summary counts, in total and per dataset, current up to
+            # the dataset_states rows recorded in event_summary_watermark
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS event_summary_cache (
+                    event_type TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (event_type, severity, category)
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS event_summary_dataset_counts (
+                    dataset_id TEXT NOT NULL,
+                    event_type TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (dataset_id, event_type, severity, category)
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS event_summary_datasets (
+                    dataset_id TEXT PRIMARY KEY,
+                    snapshot_count INTEGER NOT NULL
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS event_summary_watermark (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    row_count INTEGER NOT NULL,
+                    max_id INTEGER NOT NULL,
+                    recent_events TEXT NOT NULL
+                )
+            ''')
+            # Datasets whose rows were edited in place, queued by invalidate()
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS event_summary_dirty (
+                    dataset_id TEXT PRIMARY KEY
+                )
+            ''')
+            
+            # Every column the pair diffing reads, so ordered scans never touch the table
+            self._conn.execute(f'''
+                CREATE INDEX IF NOT EXISTS idx_dataset_states_event_cover
+                ON dataset_states(dataset_id, {SNAPSHOT_COLUMNS})
+            ''')
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not initialize event extraction tables: {e}")
+    
+    def extract_events_for_dataset(self, dataset_id: str, emit_snapshot_markers: bool = False) -> List[DatasetEvent]:
+        """Extract all events for a specific dataset; SNAPSHOT_CREATED markers are
+        only emitted on request since they repeat what dataset_states already records"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self._conn.cursor()
+            
+            # Cheap probe answered from an index alone: ids are AUTOINCREMENT and never
+            # reused, so any insert, INSERT OR REPLACE or delete moves the count or max id
+            cache_key = (dataset_id, emit_snapshot_markers)
+            if self._cache_events:
+                cursor.execute(
+                    'SELECT COUNT(*), MAX(id) FROM dataset_states WHERE dataset_id = ?', (dataset_id,)
+                )
+                probe = cursor.fetchone()
+                
+                cached = self._event_cache.get(cache_key)
+                if cached is not None and cached[0] == probe:
+                    self._event_cache.move_to_end(cache_key)
+                    return list(cached[1])
             
             # Get all snapshots for this dataset
-            cursor.execute('''
-                SELECT snapshot_date, title, agency, url, status_code, content_type,
-                       resource_format, schema, last_modified, availability, row_count, 
-                       column_count, file_size, content_hash
+            cursor.execute(f'''
+                SELECT {SNAPSHOT_COLUMNS}
                 FROM dataset_states
                 WHERE dataset_id = ?
                 ORDER BY snapshot_date ASC
             ''', (dataset_id,))
             
             snapshots = cursor.fetchall()
-            if len(snapshots) < 2:
-                conn.close()
-                return []
+            events = self._extract_events_from_snapshots(dataset_id, snapshots, emit_snapshot_markers)
             
-            events = []
-            for i in range(1, len(snapshots)):
-                prev = snapshots[i-1]
-                curr = snapshots[i]
-                
-                # Extract events from this snapshot pair
-                snapshot_events = self._extract_events_from_snapshot_pair(
-                    dataset_id, prev, curr, i
-                )
-                events.extend(snapshot_events)
+            if self._cache_events:
+                self._event_cache[cache_key] = (probe, tuple(events))
+                self._event_cache.move_to_end(cache_key)
+                if len(self._event_cache) > EVENT_CACHE_SIZE:
+                    self._event_cache.popitem(last=False)
             
-            conn.close()
             return events
             
         except Exception as e:
             logger.error(f"Error extracting events for {dataset_id}: {e}")
             return []
     
-    def _extract_events_from_snapshot_pair(self, dataset_id: str, prev: Tuple, curr: Tuple, index: int) -> List[DatasetEvent]:
+    def _extract_events_range(self, dataset_id: str, start_date: Optional[str], end_date: Optional[str],
+                              emit_snapshot_markers: bool = False) -> List[DatasetEvent]:
+        """Extract the events dated within [start_date, end_date], diffing only the snapshots in range"""
+        try:
+            conditions = ['dataset_id = ?']
+            params = [dataset_id]
+            if start_date:
+                # Events carry the later snapshot's date, so keep the one snapshot
+                # before the window as the first pair's predecessor
+                conditions.append('''snapshot_date >= COALESCE((
+                    SELECT MAX(snapshot_date) FROM dataset_states
+                    WHERE dataset_id = ? AND snapshot_date < ?
+                ), ?)''')
+                params.extend([dataset_id, start_date, start_date])
+            if end_date:
+                conditions.append('snapshot_date <= ?')
+                params.append(end_date)
+            
+            cursor = self._conn.cursor()
+            cursor.execute(f'''
+                SELECT {SNAPSHOT_COLUMNS}
+                FROM dataset_states
+                WHERE {' AND '.join(conditions)}
+                ORDER BY snapshot_date ASC
+            ''', params)
+            snapshots = cursor.fetchall()
+            
+            # Snapshot markers are numbered by position in the full history
+            start_index = 0
+            if emit_snapshot_markers and snapshots:
+                cursor.execute('''
+                    SELECT COUNT(*) FROM dataset_states
+                    WHERE dataset_id = ? AND snapshot_date < ?
+                ''', (dataset_id, snapshots[0][0]))
+                start_index = cursor.fetchone()[0]
+            
+            return self._extract_events_from_snapshots(dataset_id, snapshots, emit_snapshot_markers, start_index)
+            
+        except Exception as e:
+            logger.error(f"Error extracting events for {dataset_id}: {e}")
+            return []
+    
+    def _extract_events_from_snapshots(self, dataset_id: str, snapshots, emit_snapshot_markers: bool = False,
+                                       start_index: int = 0) -> List[DatasetEvent]:
+        """Extract events from a dataset's snapshots, given in snapshot_date order; start_index
+        is the position of the first snapshot in the dataset's full history"""
+        events = []
+        prev = None
+        self._extracted_at = datetime.now().isoformat()
+        
+        # Only the previous snapshot is kept, so snapshots may be a live cursor
+        for index, curr in enumerate(snapshots, start_index):
+            if prev is not None:
+                events.extend(self._extract_events_from_snapshot_pair(
+                    dataset_id, prev, curr, index, emit_snapshot_markers
+                ))
+            prev = curr
+        
+        return events
+    
+    def _extract_events_from_snapshot_pair(self, dataset_id: str, prev: Tuple, curr: Tuple, index: int,
+                                           emit_snapshot_markers: bool = False) -> List[DatasetEvent]:
         """Extract events from a pair of consecutive snapshots"""
         events = []
         timestamp = curr[0]  # snapshot_date
         
+        # Unchanged snapshots are the common case; one C-level tuple compare
+        # stands in for every column check below
+        if prev[1:] == curr[1:]:
+            if emit_snapshot_markers:
+                events.append(self._create_event(
+                    dataset_id, EventType.SNAPSHOT_CREATED, EventSeverity.LOW,
+                    timestamp, f"Snapshot {index} created", None, None, 0.1
+                ))
+            return events
+        
         # Metadata changes
         if prev[1] != curr[1]:  # title
             events.append(self._create_event(
@@ -154,38 +392,7 @@ class EnhancedEventExtractor:
                 timestamp, "Content type changed", prev[5], curr[5], 0.6
             ))
         
-        # Schema changes
-        schema_events = self._extract_schema_events(dataset_id, prev, curr, timestamp)
-        events.extend(schema_events)
-        
-        # Content changes
-        content_events = self._extract_content_events(dataset_id, prev, curr, timestamp)
-        events.extend(content_events)
-        
-        # Availability changes
-        availability_events = self._extract_availability_events(dataset_id, prev, curr, timestamp)
-        events.extend(availability_events)
-        
-        # Temporal changes
-        if prev[8] != curr[8]:  # last_modified
-            events.append(self._create_event(
-                dataset_id, EventType.LAST_MODIFIED_CHANGED, EventSeverity.LOW,
-                timestamp, "Last modified date changed", prev[8], curr[8], 0.2
-            ))
-        
-        # Always add snapshot created event
-        events.append(self._create_event(
-            dataset_id, EventType.SNAPSHOT_CREATED, EventSeverity.LOW,
-            timestamp, f"Snapshot {index} created", None, None, 0.1
-        ))
-        
-        return events
-    
-    def _extract_schema_events(self, dataset_id: str, prev: Tuple, curr: Tuple, timestamp: str) -> List[DatasetEvent]:
-        """Extract schema-related events"""
-        events = []
-        
-        # Row count changes
+        # Schema: row count changes
         prev_rows = prev[10] if prev[10] is not None else 0
         curr_rows = curr[10] if curr[10] is not None else 0
         
@@ -194,16 +401,16 @@ class EnhancedEventExtractor:
                 events.append(self._create_event(
                     dataset_id, EventType.ROW_COUNT_INCREASED, EventSeverity.MEDIUM,
                     timestamp, f"Row count increased from {prev_rows} to {curr_rows}",
-                    str(prev_rows), str(curr_rows), 0.6
+                    prev_rows, curr_rows, 0.6
                 ))
             else:
                 events.append(self._create_event(
                     dataset_id, EventType.ROW_COUNT_DECREASED, EventSeverity.HIGH,
                     timestamp, f"Row count decreased from {prev_rows} to {curr_rows}",
-                    str(prev_rows), str(curr_rows), 0.8
+                    prev_rows, curr_rows, 0.8
                 ))
         
-        # Column count changes
+        # Schema: column count changes
         prev_cols = prev[11] if prev[11] is not None else 0
         curr_cols = curr[11] if curr[11] is not None else 0
         
@@ -212,37 +419,30 @@ class EnhancedEventExtractor:
                 events.append(self._create_event(
                     dataset_id, EventType.SCHEMA_EXPAND, EventSeverity.MEDIUM,
                     timestamp, f"Schema expanded from {prev_cols} to {curr_cols} columns",
-                    str(prev_cols), str(curr_cols), 0.6
+                    prev_cols, curr_cols, 0.6
                 ))
             else:
                 events.append(self._create_event(
                     dataset_id, EventType.SCHEMA_SHRINK, EventSeverity.HIGH,
                     timestamp, f"Schema shrunk from {prev_cols} to {curr_cols} columns",
-                    str(prev_cols), str(curr_cols), 0.8
+                    prev_cols, curr_cols, 0.8
                 ))
         
-        # Schema structure changes
-        if prev[7] and curr[7]:  # schema
+        # Schema: structure changes; identical strings can't differ, so only
+        # parse when the raw JSON does
+        if prev[7] and curr[7] and prev[7] != curr[7]:  # schema
             try:
-                prev_schema = json.loads(prev[7])
-                curr_schema = json.loads(curr[7])
-                
-                if prev_schema != curr_schema:
+                if json.loads(prev[7]) != json.loads(curr[7]):
+                    # The stored columns are already JSON, keep them as-is
                     events.append(self._create_event(
                         dataset_id, EventType.STRUCTURE_CHANGED, EventSeverity.HIGH,
                         timestamp, "Dataset structure changed",
-                        json.dumps(prev_schema), json.dumps(curr_schema), 0.9
+                        prev[7], curr[7], 0.9
                     ))
             except (json.JSONDecodeError, TypeError):
                 pass
         
-        return events
-    
-    def _extract_content_events(self, dataset_id: str, prev: Tuple, curr: Tuple, timestamp: str) -> List[DatasetEvent]:
-        """Extract content-related events"""
-        events = []
-        
-        # File size changes
+        # Content: file size changes
         prev_size = prev[12] if prev[12] is not None else 0
         curr_size = curr[12] if curr[12] is not None else 0
         
@@ -250,10 +450,10 @@ class EnhancedEventExtractor:
             events.append(self._create_event(
                 dataset_id, EventType.FILE_SIZE_CHANGED, EventSeverity.MEDIUM,
                 timestamp, f"File size changed from {prev_size} to {curr_size} bytes",
-                str(prev_size), str(curr_size), 0.5
+                prev_size, curr_size, 0.5
             ))
         
-        # Content hash changes (indicates content drift)
+        # Content: hash changes (indicates content drift)
         if prev[13] != curr[13]:  # content_hash
             events.append(self._create_event(
                 dataset_id, EventType.CONTENT_DRIFT, EventSeverity.MEDIUM,
@@ -261,12 +461,6 @@ class EnhancedEventExtractor:
                 prev[13], curr[13], 0.7
             ))
         
-        return events
-    
-    def _extract_availability_events(self, dataset_id: str, prev: Tuple, curr: Tuple, timestamp: str) -> List[DatasetEvent]:
-        """Extract availability-related events"""
-        events = []
-        
         # Availability changes
         if prev[9] != curr[9]:  # availability
             if curr[9] == 'available':
@@ -282,7 +476,7 @@ class EnhancedEventExtractor:
                     prev[9], curr[9], 0.9
                 ))
         
-        # Status code changes
+        # Availability: status code changes
         if prev[4] != curr[4]:  # status_code
             events.append(self._create_event(
                 dataset_id, EventType.STATUS_CODE_CHANGED, EventSeverity.MEDIUM,
@@ -290,13 +484,27 @@ class EnhancedEventExtractor:
                 str(prev[4]), str(curr[4]), 0.5
             ))
         
+        # Temporal changes
+        if prev[8] != curr[8]:  # last_modified
+            events.append(self._create_event(
+                dataset_id, EventType.LAST_MODIFIED_CHANGED, EventSeverity.LOW,
+                timestamp, "Last modified date changed", prev[8], curr[8], 0.2
+            ))
+        
+        if emit_snapshot_markers:
+            events.append(self._create_event(
+                dataset_id, EventType.SNAPSHOT_CREATED, EventSeverity.LOW,
+                timestamp, f"Snapshot {index} created", None, None, 0.1
+            ))
+        
         return events
     
     def _create_event(self, dataset_id: str, event_type: EventType, severity: EventSeverity,
-                     timestamp: str, description: str, old_value: Optional[str], 
-                     new_value: Optional[str], impact_score: float) -> DatasetEvent:
+                     timestamp: str, description: str, old_value: Optional[Union[str, int]], 
+                     new_value: Optional[Union[str, int]], impact_score: float) -> DatasetEvent:
         """Create a dataset event"""
-        event_id = hashlib.md5(f"{dataset_id}_{event_type.value}_{timestamp}".encode()).hexdigest()[:12]
+        # A 6-byte BLAKE2b digest yields the 12 hex chars directly; the id is not security-sensitive
+        event_id = hashlib.blake2b(f"{dataset_id}_{EVENT_TYPE_NAMES[event_type]}_{timestamp}".encode(), digest_size=6).hexdigest()
         
         return DatasetEvent(
             event_id=event_id,
@@ -309,82 +517,54 @@ class EnhancedEventExtractor:
             new_value=new_value,
             impact_score=impact_score,
             metadata={
-                'extracted_at': datetime.now().isoformat(),
+                'extracted_at': self._extracted_at,
                 'event_type_category': self._get_event_category(event_type)
             }
         )
     
     def _get_event_category(self, event_type: EventType) -> str:
         """Get category for event type"""
-        if event_type.value.startswith('TITLE_') or event_type.value.startswith('AGENCY_') or \
-           event_type.value.startswith('URL_') or event_type.value.startswith('DESCRIPTION_') or \
-           event_type.value.startswith('LICENSE_') or event_type.value.startswith('PUBLISHER_'):
-            return 'metadata'
-        elif event_type.value.startswith('SCHEMA_') or event_type.value.startswith('COLUMN_') or \
-             event_type.value.startswith('DATA_TYPE_') or event_type.value.startswith('STRUCTURE_'):
-            return 'schema'
-        elif event_type.value.startswith('ROW_COUNT_') or event_type.value.startswith('CONTENT_') or \
-             event_type.value.startswith('FILE_SIZE_'):
-            return 'content'
-        elif event_type.value.startswith('BECAME_') or event_type.value.startswith('STATUS_'):
-            return 'availability'
+        return _CATEGORY_BY_EVENT.get(event_type, 'temporal')
+    
+    def invalidate(self, dataset_ids: Optional[List[str]] = None):
+        """Drop the cached events and summary counts of datasets whose dataset_states rows were
+        edited in place (UPDATE), which the caches' row probes cannot see; None drops everything"""
+        if dataset_ids is None:
+            self._event_cache.clear()
         else:
-            return 'temporal'
+            dataset_ids = set(dataset_ids)
+            for cache_key in [key for key in self._event_cache if key[0] in dataset_ids]:
+                del self._event_cache[cache_key]
+        
+        try:
+            if dataset_ids is None:
+                # Without a watermark the next cached summary is rebuilt in full
+                self._conn.execute('DELETE FROM event_summary_watermark')
+            else:
+                self._conn.executemany('INSERT OR REPLACE INTO event_summary_dirty (dataset_id) VALUES (?)',
+                                       [(dataset_id,) for dataset_id in dataset_ids])
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
     
-    def get_event_summary(self) -> Dict:
-        """Get summary of all events across all datasets"""
+    def get_event_summary(self, max_workers: Optional[int] = None, include_recent: bool = True,
+                          use_cache: bool = False) -> Dict:
+        """Get summary of all events across all datasets. include_recent=False counts in SQL
+        without building events and leaves recent_events empty. use_cache=True keeps the summary
+        in event_summary_cache and on each call only re-diffs datasets with rows added, replaced
+        or deleted since its watermark, plus those passed to invalidate()"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get all unique dataset IDs
-            cursor.execute('SELECT DISTINCT dataset_id FROM dataset_states')
-            dataset_ids = [row[0] for row in cursor.fetchall()]
-            
-            all_events = []
-            for dataset_id in dataset_ids:
-                events = self.extract_events_for_dataset(dataset_id)
-                all_events.extend(events)
+            if include_recent and use_cache:
+                return self._get_cached_summary(max_workers)
             
-            conn.close()
-            
-            # Analyze events
-            event_counts = {}
-            severity_counts = {}
-            category_counts = {}
-            
-            for event in all_events:
-                # Count by type
-                event_type = event.event_type.value
-                event_counts[event_type] = event_counts.get(event_type, 0) + 1
-                
-                # Count by severity
-                severity = event.severity.value
-                severity_counts[severity] = severity_counts.get(severity, 0) + 1
-                
-                # Count by category
-                category = event.metadata.get('event_type_category', 'unknown')
-                category_counts[category] = category_counts.get(category, 0) + 1
+            summary = self._merge_partials(self._summary_partials(max_workers, include_recent))
             
-            return {
-                'total_events': len(all_events),
-                'total_datasets': len(dataset_ids),
-                'event_counts': event_counts,
-                'severity_counts': severity_counts,
-                'category_counts': category_counts,
-                'recent_events': [
-                    {
-                        'event_id': event.event_id,
-                        'dataset_id': event.dataset_id,
-                        'event_type': event.event_type.value,
-                        'severity': event.severity.value,
-                        'timestamp': event.timestamp,
-                        'description': event.description,
-                        'impact_score': event.impact_score
-                    }
-                    for event in sorted(all_events, key=lambda x: x.timestamp, reverse=True)[:50]
-                ]
-            }
+            return self._format_summary(
+                summary['counts'],
+                summary['total_datasets'],
+                [self._recent_event_dict(event) for event in summary['recent_events']]
+            )
             
         except Exception as e:
             logger.error(f"Error getting event summary: {e}")
@@ -397,30 +577,414 @@ class EnhancedEventExtractor:
                 'recent_events': []
             }
     
+    def _get_cached_summary(self, max_workers: Optional[int]) -> Dict:
+        """Bring the persisted summary up to date with dataset_states and return it. Changed
+        datasets are diffed with no lock held; the write lock only covers applying the result."""
+        cursor = self._conn.cursor()
+        try:
+            # Probe before reading any snapshot: ids are AUTOINCREMENT, so every
+            # later insert or replace shows up in this refresh or the next one
+            cursor.execute('SELECT COUNT(*), COALESCE(MAX(id), 0) FROM dataset_states')
+            probe = cursor.fetchone()
+            cursor.execute('SELECT row_count, max_id FROM event_summary_watermark WHERE id = 1')
+            watermark = cursor.fetchone()
+            cursor.execute('SELECT rowid, dataset_id FROM event_summary_dirty')
+            dirty = cursor.fetchall()
+            dirty_upto = max((rowid for rowid, _ in dirty), default=0)
+            
+            if watermark != probe or dirty:
+                changed = None
+                if watermark is not None:
+                    changed = self._changed_datasets(cursor, watermark, probe,
+                                                     [dataset_id for _, dataset_id in dirty])
+                
+                if changed is not None:
+                    applied = self._apply_summary(self._summarize_datasets(changed), changed,
+                                                  watermark, probe, dirty_upto)
+                if changed is None or not applied:
+                    self._apply_summary(self._merge_partials(self._summary_partials(max_workers, True)),
+                                        None, watermark, probe, dirty_upto)
+            
+            # One read transaction so the counts and recent events match
+            cursor.execute('BEGIN')
+            cursor.execute('''
+                SELECT event_type, severity, category, count
+                FROM event_summary_cache
+                ORDER BY rowid
+            ''')
+            counts = Counter({(event_type, severity, category): count
+                              for event_type, severity, category, count in cursor})
+            cursor.execute('SELECT COUNT(*) FROM event_summary_datasets')
+            total_datasets = cursor.fetchone()[0]
+            cursor.execute('SELECT recent_events FROM event_summary_watermark WHERE id = 1')
+            row = cursor.fetchone()
+            recent_events = json.loads(row[0]) if row else []
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        
+        return self._format_summary(counts, total_datasets, recent_events)
+    
+    def _changed_datasets(self, cursor: sqlite3.Cursor, watermark: Tuple[int, int],
+                          probe: Tuple[int, int], dirty: List[str]) -> Optional[List[str]]:
+        """Datasets with rows added or replaced since the watermark, plus the invalidated ones;
+        None when rows also vanished from other datasets, or too many changed, for a delta"""
+        row_count, max_id = probe
+        cursor.execute('SELECT DISTINCT dataset_id FROM dataset_states WHERE id > ? AND id <= ?',
+                       (watermark[1], max_id))
+        changed = sorted(set(dirty).union(row[0] for row in cursor))
+        
+        # Every other dataset must still hold exactly the rows already summarized
+        current = stored = 0
+        for start in range(0, len(changed), SQLITE_MAX_VARIABLES - 1):
+            chunk = changed[start:start + SQLITE_MAX_VARIABLES - 1]
+            placeholders = ','.join(['?'] * len(chunk))
+            cursor.execute(f'''
+                SELECT COUNT(*) FROM dataset_states
+                WHERE dataset_id IN ({placeholders}) AND id <= ?
+            ''', (*chunk, max_id))
+            current += cursor.fetchone()[0]
+            cursor.execute(f'''
+                SELECT COALESCE(SUM(snapshot_count), 0) FROM event_summary_datasets
+                WHERE dataset_id IN ({placeholders})
+            ''', chunk)
+            stored += cursor.fetchone()[0]
+        if row_count - current != watermark[0] - stored:
+            return None
+        
+        # Past half the datasets a parallel full rebuild is cheaper
+        cursor.execute('SELECT COUNT(*) FROM event_summary_datasets')
+        if len(changed) * 2 > cursor.fetchone()[0]:
+            return None
+        
+        return changed
+    
+    def _apply_summary(self, summary: Dict, changed: Optional[List[str]],
+                       watermark: Optional[Tuple[int, int]], probe: Tuple[int, int],
+                       dirty_upto: int) -> bool:
+        """Store a full rebuild (changed=None) or the re-diffed counts of the changed datasets,
+        then move the watermark from watermark to probe. Returns False when a delta cannot keep
+        the recent events exact and a full rebuild is needed instead."""
+        recent = [self._recent_event_dict(event) for event in summary['recent_events']]
+        cursor = self._conn.cursor()
+        try:
+            # The write lock serializes refreshes, so each one is applied once
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT row_count, max_id, recent_events FROM event_summary_watermark WHERE id = 1')
+            row = cursor.fetchone()
+            
+            # A concurrent refresh already moved the watermark
+            if (row[:2] if row else None) != watermark:
+                self._conn.rollback()
+                return True
+            if changed is None:
+                cursor.execute('DELETE FROM event_summary_cache')
+                cursor.execute('DELETE FROM event_summary_dataset_counts')
+                cursor.execute('DELETE FROM event_summary_datasets')
+                delta = Counter(summary['counts'])
+                recent_events = recent
+            else:
+                # Swap the changed datasets' old counts and recent events for the new ones
+                changed_ids = set(changed)
+                delta = Counter()
+                for start in range(0, len(changed), SQLITE_MAX_VARIABLES):
+                    chunk = changed[start:start + SQLITE_MAX_VARIABLES]
+                    placeholders = ','.join(['?'] * len(chunk))
+                    cursor.execute(f'''
+                        SELECT event_type, severity, category, count
+                        FROM event_summary_dataset_counts
+                        WHERE dataset_id IN ({placeholders})
+                    ''', chunk)
+                    for event_type, severity, category, count in cursor:
+                        delta[(event_type, severity, category)] -= count
+                    cursor.execute(f'''
+                        DELETE FROM event_summary_dataset_counts
+                        WHERE dataset_id IN ({placeholders})
+                    ''', chunk)
+                    cursor.execute(f'''
+                        DELETE FROM event_summary_datasets
+                        WHERE dataset_id IN ({placeholders})
+                    ''', chunk)
+                for key, count in summary['counts'].items():
+                    delta[key] += count
+                
+                previous = json.loads(row[2])
+                kept = [event for event in previous if event['dataset_id'] not in changed_ids]
+                recent_events = heapq.nlargest(50, chain(recent, kept), key=itemgetter('timestamp'))
+                # Events of unchanged datasets that fell below the old top 50 are not
+                # stored, so a shrunken or older list can't be completed from here
+                if len(previous) == 50 and len(kept) < 50 and (
+                        len(recent_events) < 50 or
+                        recent_events[-1]['timestamp'] < previous[-1]['timestamp']):
+                    self._conn.rollback()
+                    return False
+            
+            cursor.executemany('''
+                INSERT INTO event_summary_dataset_counts (dataset_id, event_type, severity, category, count)
+                VALUES (?, ?, ?, ?, ?)
+            ''', summary['dataset_counts'])
+            cursor.executemany('''
+                INSERT INTO event_summary_datasets (dataset_id, snapshot_count)
+                VALUES (?, ?)
+            ''', summary['dataset_snapshots'])
+            cursor.executemany('''
+                INSERT INTO event_summary_cache (event_type, severity, category, count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(event_type, severity, category) DO UPDATE SET count = count + excluded.count
+            ''', [(*key, count) for key, count in delta.items() if count])
+            cursor.execute('DELETE FROM event_summary_cache WHERE count = 0')
+            cursor.execute('''
+                INSERT OR REPLACE INTO event_summary_watermark (id, row_count, max_id, recent_events)
+                VALUES (1, ?, ?, ?)
+            ''', (*probe, json.dumps(recent_events)))
+            cursor.execute('DELETE FROM event_summary_dirty WHERE rowid <= ?', (dirty_upto,))
+            self._conn.commit()
+            return True
+        except Exception:
+            self._conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    
+    def _summary_partials(self, max_workers: Optional[int], include_recent: bool) -> List[Dict]:
+        """Per-range summary partials over every dataset, in dataset_id order"""
+        if not include_recent:
+            return [self._count_events_sql()]
+        
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        
+        ranges = [(None, None)]
+        if max_workers > 1:
+            dataset_ids = [row[0] for row in self._conn.execute(
+                'SELECT DISTINCT dataset_id FROM dataset_states ORDER BY dataset_id ASC'
+            )]
+            
+            # Contiguous id ranges keep the merged output in scan order
+            workers = min(max_workers, len(dataset_ids))
+            if workers > 1:
+                bounds = [len(dataset_ids) * i // workers for i in range(workers + 1)]
+                ranges = [(dataset_ids[bounds[i]], dataset_ids[bounds[i + 1] - 1]) for i in range(workers)]
+        
+        if len(ranges) > 1:
+            # Diffing is CPU-bound Python, so fan the ranges out to processes
+            with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+                return list(executor.map(_summarize_range_worker,
+                                         [(self.db_path, first_id, last_id) for first_id, last_id in ranges]))
+        
+        return [self._summarize_range()]
+    
+    def _merge_partials(self, partials: List[Dict]) -> Dict:
+        """Combine summary partials into one, keeping the 50 most recent events"""
+        counts = Counter()
+        for partial in partials:
+            counts.update(partial['counts'])
+        
+        return {
+            'counts': counts,
+            'dataset_counts': [row for partial in partials for row in partial.get('dataset_counts', ())],
+            'dataset_snapshots': [row for partial in partials for row in partial.get('dataset_snapshots', ())],
+            'total_datasets': sum(partial['total_datasets'] for partial in partials),
+            'recent_events': list(islice(heapq.merge(*(partial['recent_events'] for partial in partials),
+                                                     key=attrgetter('timestamp'), reverse=True), 50))
+        }
+    
+    def _format_summary(self, counts: Counter, total_datasets: int, recent_events: List[Dict]) -> Dict:
+        """Shape (event_type, severity, category) counts into the summary returned to callers"""
+        event_counts = Counter()
+        severity_counts = Counter()
+        category_counts = Counter()
+        for (event_type, severity, category), count in counts.items():
+            event_counts[event_type] += count
+            severity_counts[severity] += count
+            category_counts[category] += count
+        
+        return {
+            'total_events': counts.total(),
+            'total_datasets': total_datasets,
+            'event_counts': dict(event_counts),
+            'severity_counts': dict(severity_counts),
+            'category_counts': dict(category_counts),
+            'recent_events': recent_events
+        }
+    
+    def _recent_event_dict(self, event: DatasetEvent) -> Dict:
+        """Serialize an event for the summary's recent_events list"""
+        return {
+            'event_id': event.event_id,
+            'dataset_id': event.dataset_id,
+            'event_type': EVENT_TYPE_NAMES[event.event_type],
+            'severity': SEVERITY_NAMES[event.severity],
+            'timestamp': event.timestamp,
+            'description': event.description,
+            'impact_score': event.impact_score
+        }
+    
+    def _count_events_sql(self) -> Dict:
+        """Event counts computed by SQLite window functions over consecutive snapshots"""
+        cursor = self._conn.cursor()
+        try:
+            sums = ', '.join(f'COALESCE(SUM({condition}), 0)' for _, _, condition in _EVENT_COUNT_CONDITIONS)
+            row = cursor.execute(f'''
+                SELECT (SELECT COUNT(DISTINCT dataset_id) FROM dataset_states), {sums}
+                {_SQL_SNAPSHOT_PAIRS}
+            ''').fetchone()
+            total_datasets, pair_counts = row[0], row[1:]
+            
+            # Only pairs whose raw schema JSON differs can be structure changes
+            structure_changes = 0
+            for prev_schema, schema in cursor.execute(f'''
+                SELECT prev.schema, curr.schema
+                {_SQL_SNAPSHOT_PAIRS}
+                WHERE curr.schema != '' AND prev.schema != '' AND curr.schema != prev.schema
+            '''):
+                try:
+                    if json.loads(prev_schema) != json.loads(schema):
+                        structure_changes += 1
+                except (json.JSONDecodeError, TypeError):
+                    pass
+        finally:
+            cursor.close()
+        
+        counts = Counter()
+        tallies = [(event_type, severity, count) for (event_type, severity, _), count in zip(_EVENT_COUNT_CONDITIONS, pair_counts)]
+        tallies.append((EventType.STRUCTURE_CHANGED, EventSeverity.HIGH, structure_changes))
+        for event_type, severity, count in tallies:
+            if count:
+                counts[(EVENT_TYPE_NAMES[event_type], SEVERITY_NAMES[severity], self._get_event_category(event_type))] += count
+        
+        return {
+            'counts': counts,
+            'total_datasets': total_datasets,
+            'recent_events': []
+        }
+    
+    def _summarize_range(self, first_id: Optional[str] = None, last_id: Optional[str] = None) -> Dict:
+        """Event counts and the 50 most recent events for datasets in [first_id, last_id],
+        or for every dataset when no range is given"""
+        cursor = self._conn.cursor()
+        
+        # One ordered scan over the range; dataset_id comes last so rows
+        # keep the positional layout the pair diffing expects
+        if first_id is None:
+            cursor.execute(f'''
+                SELECT {SNAPSHOT_COLUMNS}, dataset_id
+                FROM dataset_states
+                ORDER BY dataset_id ASC, snapshot_date ASC
+            ''')
+        else:
+            cursor.execute(f'''
+                SELECT {SNAPSHOT_COLUMNS}, dataset_id
+                FROM dataset_states
+                WHERE dataset_id BETWEEN ? AND ?
+                ORDER BY dataset_id ASC, snapshot_date ASC
+            ''', (first_id, last_id))
+        
+        return self._summarize_rows(cursor)
+    
+    def _summarize_datasets(self, dataset_ids: List[str]) -> Dict:
+        """Event counts and the 50 most recent events for the given datasets' full histories"""
+        partials = []
+        for start in range(0, len(dataset_ids), SQLITE_MAX_VARIABLES):
+            chunk = sorted(dataset_ids[start:start + SQLITE_MAX_VARIABLES])
+            placeholders = ','.join(['?'] * len(chunk))
+            cursor = self._conn.cursor()
+            cursor.execute(f'''
+                SELECT {SNAPSHOT_COLUMNS}, dataset_id
+                FROM dataset_states
+                WHERE dataset_id IN ({placeholders})
+                ORDER BY dataset_id ASC, snapshot_date ASC
+            ''', chunk)
+            partials.append(self._summarize_rows(cursor))
+        
+        return self._merge_partials(partials)
+    
+    def _summarize_rows(self, cursor: sqlite3.Cursor) -> Dict:
+        """Diff snapshot rows ordered by dataset_id then snapshot_date, counting events per
+        dataset as each group is diffed and keeping only the 50 most recent"""
+        pair_counts = Counter()
+        dataset_snapshots = []
+        
+        def stream_events():
+            for dataset_id, group in groupby(cursor, key=itemgetter(14)):
+                snapshots = list(group)
+                dataset_snapshots.append((dataset_id, len(snapshots)))
+                try:
+                    events = self._extract_events_from_snapshots(dataset_id, snapshots)
+                except Exception as e:
+                    logger.error(f"Error extracting events for {dataset_id}: {e}")
+                    continue
+                
+                # Count by (dataset, type, severity); Counter.update tallies in C
+                # and the category follows from the type
+                pair_counts.update(map(attrgetter('dataset_id', 'event_type', 'severity'), events))
+                
+                # Snapshot markers are counted, one per pair, rather than built as events
+                if len(snapshots) > 1:
+                    pair_counts[(dataset_id, EventType.SNAPSHOT_CREATED, EventSeverity.LOW)] += len(snapshots) - 1
+                yield from events
+        
+        try:
+            # Only the 50 most recent events are ever held at once
+            recent_events = heapq.nlargest(50, stream_events(), key=attrgetter('timestamp'))
+        finally:
+            cursor.close()
+        
+        # Counted by enum member, named only on the way out
+        counts = Counter()
+        dataset_counts = []
+        for (dataset_id, event_type, severity), count in pair_counts.items():
+            key = (EVENT_TYPE_NAMES[event_type], SEVERITY_NAMES[severity], self._get_event_category(event_type))
+            counts[key] += count
+            dataset_counts.append((dataset_id, *key, count))
+        
+        return {
+            'counts': counts,
+            'dataset_counts': dataset_counts,
+            'dataset_snapshots': dataset_snapshots,
+            'total_datasets': len(dataset_snapshots),
+            'recent_events': recent_events
+        }
+    
     def get_events_for_timeline(self, dataset_id: str, start_date: Optional[str] = None, 
-                               end_date: Optional[str] = None) -> List[Dict]:
+                               end_date: Optional[str] = None, emit_snapshot_markers: bool = False) -> List[Dict]:
         """Get events for timeline visualization"""
-        events = self.extract_events_for_dataset(dataset_id)
-        
-        # Filter by date range if provided
-        if start_date:
-            events = [e for e in events if e.timestamp >= start_date]
-        if end_date:
-            events = [e for e in events if e.timestamp <= end_date]
+        if start_date or end_date:
+            events = self._extract_events_range(dataset_id, start_date, end_date, emit_snapshot_markers)
+        else:
+            events = self.extract_events_for_dataset(dataset_id, emit_snapshot_markers)
         
         # Convert to timeline format
         timeline_events = []
         for event in events:
             timeline_events.append({
                 'id': event.event_id,
-                'type': event.event_type.value,
-                'severity': event.severity.value,
+                'type': EVENT_TYPE_NAMES[event.event_type],
+                'severity': SEVERITY_NAMES[event.severity],
                 'timestamp': event.timestamp,
                 'description': event.description,
-                'old_value': event.old_value,
-                'new_value': event.new_value,
+                'old_value': _serialize_value(event.old_value),
+                'new_value': _serialize_value(event.new_value),
                 'impact_score': event.impact_score,
                 'category': event.metadata.get('event_type_category', 'unknown')
             })
         
         return sorted(timeline_events, key=lambda x: x['timestamp'])
+
+def _serialize_value(value: Optional[Union[str, int]]) -> Optional[str]:
+    """Render an event's old/new value as the string timelines expect"""
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+def _summarize_range_worker(args: Tuple[str, str, str]) -> Dict:
+    """Process pool entry point: summarize one dataset_id range with its own connection"""
+    db_path, first_id, last_id = args
+    extractor = EnhancedEventExtractor(db_path)
+    try:
+        return extractor._summarize_range(first_id, last_id)
+    finally:
+        extractor.close()
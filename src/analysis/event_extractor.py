@@ -6,11 +6,29 @@ Implements the event specification from the plan
 
 import json
 import sqlite3
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
 
+# Applied once per connection: WAL lets readers run during writes and
+# synchronous=NORMAL drops the fsync on every commit
+CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA cache_size=-65536;
+    PRAGMA temp_store=MEMORY;
+"""
+
+# Secondary indexes on events, created after the table so bulk loads can
+# drop and rebuild them instead of maintaining them row by row
+EVENT_INDEXES = {
+    'idx_events_dataset_date': 'dataset_id, snapshot_date',
+    'idx_events_type_severity': 'event_type, severity',
+    'idx_events_date': 'snapshot_date',
+}
+
 class EventType(Enum):
     # Availability events
     NEW = "NEW"
@@ -60,12 +78,30 @@ class EventExtractor:
     
     def __init__(self, db_path: str = "datasets.db"):
         self.db_path = db_path
-        self._init_database()
+        self._local = threading.local()
+        self._create_tables()
+        self.ensure_indexes()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's long-lived connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   isolation_level=None)
+            conn.executescript(CONNECTION_PRAGMAS)
+            self._local.conn = conn
+        return conn
+    
+    def close(self):
+        """Close the calling thread's database connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
     
-    def _init_database(self):
-        """Initialize events table"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _create_tables(self):
+        """Create the events table"""
+        cursor = self._connect().cursor()
         
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS events (
@@ -78,25 +114,12 @@ class EventExtractor:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        
-        # Create indexes for efficient querying
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_events_dataset_date 
-            ON events(dataset_id, snapshot_date)
-        ''')
-        
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_events_type_severity 
-            ON events(event_type, severity)
-        ''')
-        
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_events_date 
-            ON events(snapshot_date)
-        ''')
-        
-        conn.commit()
-        conn.close()
+    
+    def ensure_indexes(self, cursor: Optional[sqlite3.Cursor] = None):
+        """Create the query indexes on events if they are missing"""
+        cursor = cursor or self._connect().cursor()
+        for name, columns in EVENT_INDEXES.items():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON events({columns})')
     
     def extract_events_from_availability(self, availability_events: List[Dict]) -> List[Event]:
         """Extract events from availability changes"""
@@ -402,25 +425,31 @@ class EventExtractor:
     
     def store_events(self, events: List[Event]):
         """Store events in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._connect().cursor()
         
-        for event in events:
-            cursor.execute('''
+        # One batched statement inside one explicit transaction
+        cursor.execute('BEGIN')
+        try:
+            cursor.executemany('''
                 INSERT INTO events
                 (dataset_id, snapshot_date, event_type, severity, details, created_at)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (
-                event.dataset_id,
-                event.snapshot_date,
-                event.event_type.value,
-                event.severity.value,
-                json.dumps(event.details),
-                event.created_at.isoformat()
+                (
+                    event.dataset_id,
+                    event.snapshot_date,
+                    event.event_type.value,
+                    event.severity.value,
+                    json.dumps(event.details),
+                    event.created_at.isoformat()
+                )
+                for event in events
             ))
-        
-        conn.commit()
-        conn.close()
+            cursor.execute('COMMIT')
+        except Exception:
+            # The connection outlives this call, so never leave it mid-transaction
+            cursor.execute('ROLLBACK')
+            raise
     
     def get_events(self, dataset_id: Optional[str] = None,
                   event_type: Optional[EventType] = None,
@@ -429,8 +458,7 @@ class EventExtractor:
                   date_to: Optional[str] = None,
                   limit: int = 100) -> List[Dict]:
         """Query events with filters"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._connect().cursor()
         
         query = '''
             SELECT dataset_id, snapshot_date, event_type, severity, details, created_at
@@ -471,13 +499,11 @@ class EventExtractor:
             event_data['details'] = json.loads(event_data['details'] or '{}')
             events.append(event_data)
         
-        conn.close()
         return events
     
     def get_event_summary(self) -> Dict[str, Any]:
         """Get summary statistics of events"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._connect().cursor()
         
         # Total events
         cursor.execute('SELECT COUNT(*) FROM events')
@@ -515,8 +541,6 @@ class EventExtractor:
         ''')
         high_severity_events = cursor.fetchone()[0]
         
-        conn.close()
-        
         return {
             "total_events": total_events,
             "events_by_type": events_by_type,
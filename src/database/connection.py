@@ -94,7 +94,11 @@ def init_database():
             "CREATE INDEX IF NOT EXISTS idx_datasets_agency ON datasets(agency)",
             "CREATE INDEX IF NOT EXISTS idx_datasets_title ON datasets(title)",
             "CREATE INDEX IF NOT EXISTS idx_state_diffs_dataset_id ON state_diffs(dataset_id)",
-            "CREATE INDEX IF NOT EXISTS idx_state_diffs_date ON state_diffs(change_date)"
+            "CREATE INDEX IF NOT EXISTS idx_state_diffs_date ON state_diffs(change_date)",
+            # Composite indexes for the latest-per-dataset summary and diff engine lookups
+            "CREATE INDEX IF NOT EXISTS idx_ds_dsid_created ON dataset_states(dataset_id, created_at DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_ds_dsid_snapshot ON dataset_states(dataset_id, snapshot_date DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_lil_dsid ON lil_manifests(dataset_id) WHERE dataset_id IS NOT NULL"
         ]
         
         for index_sql in indexes:
@@ -28,9 +28,9 @@ from src.processing.backfill_dimensions import DimensionBackfillProcessor
 # New enhanced systems
 from src.core.availability_detector import AvailabilityDetector, DatasetStatus
 from src.analysis.enhanced_diff_engine_v2 import EnhancedDiffEngineV2
-from src.analysis.event_extractor import EventExtractor, EventType, EventSeverity
+from src.analysis.event_extractor import EventType, EventSeverity
 from src.visualization.chromogram_timeline_v2 import ChromogramTimelineV2
-from src.api.enhanced_endpoints import enhanced_bp
+from src.api.enhanced_endpoints import enhanced_bp, event_service
 from src.api.notifications_api import notifications_bp
 
 app = Flask(__name__, 
@@ -58,6 +58,7 @@ timeline_visualizer = TimelineVisualizer()
 agency_analytics = AgencyAnalytics()
 lil_integration = LILIntegration()
 enhanced_diff_engine = EnhancedDiffEngine()
+enhanced_diff_engine_v2 = EnhancedDiffEngineV2()
 chromogram_timeline = ChromogramTimeline()
 full_database_processor = FullDatabaseProcessor()
 scaled_monitor = ScaledMonitor()
@@ -3828,7 +3829,7 @@ def api_lil_refresh():
 def api_volatility(dataset_id):
     """Get volatility metrics for dataset"""
     try:
-        metrics = enhanced_diff_engine.get_volatility_metrics(dataset_id)
+        metrics = list(enhanced_diff_engine.get_volatility_metrics(dataset_id))
         return jsonify({
             'dataset_id': dataset_id,
             'metrics': metrics
@@ -3840,7 +3841,7 @@ def api_volatility(dataset_id):
 def api_events(dataset_id):
     """Get change events for dataset"""
     try:
-        events = enhanced_diff_engine.get_change_events(dataset_id)
+        events = list(enhanced_diff_engine.get_change_events(dataset_id))
         return jsonify({
             'dataset_id': dataset_id,
             'events': events
@@ -4459,7 +4460,10 @@ def api_column_changes(dataset_id):
         from src.analysis.enhanced_column_diffing import EnhancedColumnDiffing
         
         diffing = EnhancedColumnDiffing()
-        changes = diffing.get_column_changes(dataset_id)
+        try:
+            changes = diffing.get_column_changes(dataset_id)
+        finally:
+            diffing.close()
         
         return jsonify({
             'dataset_id': dataset_id,
@@ -4477,6 +4481,8 @@ def api_schema_evolution(dataset_id):
         conn = get_database_connection()
         cursor = conn.cursor()
         
+        from src.analysis.enhanced_column_diffing import decode_stored
+        
         # Get schema snapshots
         cursor.execute('''
             SELECT snapshot_date, columns, column_types, row_count, sample_data
@@ -4489,10 +4495,10 @@ def api_schema_evolution(dataset_id):
         for row in cursor.fetchall():
             evolution.append({
                 'date': row[0],
-                'columns': json.loads(row[1]) if row[1] else [],
-                'column_types': json.loads(row[2]) if row[2] else {},
+                'columns': decode_stored(row[1], []),
+                'column_types': decode_stored(row[2], {}),
                 'row_count': row[3],
-                'sample_data': json.loads(row[4]) if row[4] else []
+                'sample_data': decode_stored(row[4], [])
             })
         
         conn.close()
@@ -4980,15 +4986,13 @@ def api_availability_events():
 def api_dataset_diff(dataset_id, from_date, to_date):
     """Get detailed diff between two snapshots"""
     try:
-        diff_engine = EnhancedDiffEngineV2()
-        diff_data = diff_engine.get_diff(dataset_id, from_date, to_date)
+        diff_data = enhanced_diff_engine_v2.get_diff(dataset_id, from_date, to_date)
         
         if not diff_data:
-            # Compute diff if not stored
-            diff_result = diff_engine.compute_diff(dataset_id, from_date, to_date)
-            if diff_result:
-                diff_id = diff_engine.store_diff(diff_result)
-                diff_data = diff_engine.get_diff(dataset_id, from_date, to_date)
+            # Compute and store the diff if it is not stored yet
+            diff_id = enhanced_diff_engine_v2.compute_and_store_diff(dataset_id, from_date, to_date)
+            if diff_id:
+                diff_data = enhanced_diff_engine_v2.get_diff(dataset_id, from_date, to_date)
         
         if not diff_data:
             return jsonify({'error': 'Diff not found'}), 404
@@ -5008,8 +5012,7 @@ def api_events_normalized():
         date_to = request.args.get('date_to')
         limit = request.args.get('limit', 100, type=int)
         
-        extractor = EventExtractor()
-        events = extractor.get_events(
+        events = event_service.get_events(
             dataset_id=dataset_id,
             event_type=EventType(event_type) if event_type else None,
             severity=EventSeverity(severity) if severity else None,
@@ -5113,8 +5116,7 @@ def api_timeline_summary(dataset_id):
 def api_events_summary():
     """Get event summary statistics"""
     try:
-        extractor = EventExtractor()
-        summary = extractor.get_event_summary()
+        summary = event_service.get_event_summary()
         
         return jsonify(summary)
     except Exception as e:
@@ -5128,10 +5130,9 @@ def api_process_availability():
         events = detector.process_all_snapshots()
         
         # Extract events from availability changes
-        extractor = EventExtractor()
         availability_events = detector.get_availability_events(limit=1000)
-        normalized_events = extractor.extract_events_from_availability(availability_events)
-        extractor.store_events(normalized_events)
+        normalized_events = event_service.extract_events_from_availability(availability_events)
+        event_service.store_events(normalized_events)
         
         return jsonify({
             'message': 'Availability processing completed',